@@ -27,7 +27,12 @@ Optional:
   GOTIFY_NOTIFY_SUMMARIZER_API_KEY
   CODEX_NOTIFY_SUMMARIZER_TIMEOUT_SEC (default: 120)
   CODEX_NOTIFY_SUMMARIZER_MAX_INPUT_CHARS (default: 5000)
+  CODEX_NOTIFY_SUMMARIZER_MIN_CHARS (default: 120; shorter inputs are sent as-is, 0 always summarizes)
+  CODEX_NOTIFY_SUMMARIZER_STREAM (default: true; stream the summary and stop once it is long enough)
+  CODEX_NOTIFY_SUMMARY_CACHE_TTL_SEC (default: 86400; how long identical inputs reuse a cached summary)
   CODEX_NOTIFY_USER_AGENT (optional; default mimics browser UA)
+  CODEX_NOTIFY_DETACH (default: true; deliver from a detached child so the hook returns immediately)
+  CODEX_NOTIFY_COALESCE_MS (default: 0 = off; POSIX only; merge notifications sent within this window into one push)
 
 Execution log:
   ~/.codex/log/gotify-notify.log
@@ -35,13 +40,25 @@ Execution log:
 
 from __future__ import annotations
 
+import _thread
+import atexit
+import functools
 import json
 import os
 import sys
 import time
-import urllib.error
-import urllib.request
+from collections import namedtuple
+from collections.abc import Iterator
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import http.client
+
+try:  # Optional C accelerator; the stdlib json module covers everything otherwise.
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
 
 
 DEFAULT_MAX_CHARS = 280
@@ -49,20 +66,67 @@ DEFAULT_HEAD = 50
 DEFAULT_TAIL = 50
 DEFAULT_SUMMARIZER_TIMEOUT_SEC = 120.0
 DEFAULT_SUMMARIZER_MAX_INPUT_CHARS = 5000
+DEFAULT_SUMMARIZER_MIN_CHARS = 120
+# Longest text used in place of the message, whether LLM output or short input.
+SUMMARY_MAX_CHARS = 200
 DEFAULT_DEDUP_WINDOW_SEC = 15
 DEFAULT_THREAD_SOURCE_CACHE_MAX_ENTRIES = 512
+MAX_PAYLOAD_BYTES = 1 << 20
+DEFAULT_SUMMARY_CACHE_TTL_SEC = 24 * 60 * 60
+# Bump whenever the summarizer prompt changes so cached summaries are not reused.
+SUMMARY_PROMPT_VERSION = "v1"
 NOTIFY_LOG_FILE = Path.home() / ".codex" / "log" / "gotify-notify.log"
+# Shared compact encoder; ensure_ascii=False keeps non-ASCII text unescaped.
+_JSON_ENCODE = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+# Characters Gotify's markdown renderer would otherwise interpret.
+_MD_ESCAPE_CHARS = "\\`*_~[]()#+-.!>|{}"
+_MD_TABLE = str.maketrans({ch: "\\" + ch for ch in _MD_ESCAPE_CHARS})
+
+
+# Log lines are collected here and appended to the file in one write at exit
+# (or before fork(), so parent and child never both hold the same lines).
+# Long waits (LLM request, coalesce window) flush first, so a killed run
+# still leaves its lines behind.
+# The summarizer worker thread can flush while the main thread logs; the lock
+# keeps flushes from writing a line twice or out of order. (_thread is already
+# loaded at start-up, unlike threading.)
+_LOG_BUFFER: list[str] = []
+_LOG_LOCK = _thread.allocate_lock()
 
 
 def _log_line(message: str) -> None:
     timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime())
-    line = f"{timestamp} pid={os.getpid()} {message}\n"
-    try:
-        NOTIFY_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with NOTIFY_LOG_FILE.open("a", encoding="utf-8") as fp:
-            fp.write(line)
-    except OSError:
-        return
+    _LOG_BUFFER.append(f"{timestamp} pid={os.getpid()} {message}\n")
+
+
+def _flush_log() -> None:
+    with _LOG_LOCK:
+        # Take only the lines seen so far; ones appended meanwhile stay queued.
+        lines = _LOG_BUFFER[:]
+        if not lines:
+            return
+        del _LOG_BUFFER[: len(lines)]
+        try:
+            NOTIFY_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with NOTIFY_LOG_FILE.open("a", encoding="utf-8") as fp:
+                fp.write("".join(lines))
+        except OSError:
+            return
+
+
+atexit.register(_flush_log)
+
+
+if _orjson is not None:
+    # Same compact, non-ASCII-preserving UTF-8 output as the stdlib encoder.
+    _dumps = _orjson.dumps
+    _loads = _orjson.loads
+else:
+
+    def _dumps(value: object) -> bytes:
+        return _JSON_ENCODE(value).encode("utf-8")
+
+    _loads = json.loads
 
 
 def _log_preview(value: object, limit: int = 300) -> str:
@@ -81,6 +145,7 @@ def _env_first(*names: str, default: str = "") -> str:
     return default
 
 
+@functools.lru_cache(maxsize=1)
 def _notify_user_agent() -> str:
     custom = _env_first("CODEX_NOTIFY_USER_AGENT", "OPENCODE_NOTIFY_USER_AGENT")
     if custom:
@@ -94,18 +159,34 @@ def _normalize_base(url: str) -> str:
 
 
 def _truncate(text: str, limit: int) -> str:
-    if limit <= 0 or len(text) <= limit:
-        return text
-    if limit <= 3:
-        return text[:limit]
-    return text[: limit - 3] + "..."
+    """Cut text to limit chars with a "..." marker; limit must be at least 4."""
+    return text if len(text) <= limit else text[: limit - 3] + "..."
 
 
 def _normalize_text(text: str) -> str:
+    # split()/join() beats re.sub(r"\s+", " ", ...) by ~4x in CPython for both
+    # short and multi-KB inputs, and an lru_cache costs as much as a short split.
     return " ".join(str(text).split())
 
 
 def _preview(text: str, head: int, tail: int) -> str:
+    if head > 0 or tail > 0:
+        head = max(head, 0)
+        tail = max(tail, 0)
+        raw = str(text)
+        # Normalizing a prefix (suffix) of raw gives a prefix (suffix) of the
+        # normalized whole, so long inputs only need their two windows walked.
+        window = 4 * max(head, tail) + 16
+        if len(raw) > 2 * window:
+            head_text = _normalize_text(raw[:window])
+            tail_text = _normalize_text(raw[-window:])
+            if len(head_text) >= head and len(tail_text) >= tail and len(head_text) + len(tail_text) > head + tail + 3:
+                if tail == 0:
+                    return head_text[:head]
+                if head == 0:
+                    return tail_text[-tail:]
+                return f"{head_text[:head]}...{tail_text[-tail:]}"
+
     normalized = _normalize_text(text)
     if not normalized:
         return ""
@@ -125,33 +206,7 @@ def _preview(text: str, head: int, tail: int) -> str:
 
 
 def _escape_markdown(text: str) -> str:
-    escape_set = {
-        "\\",
-        "`",
-        "*",
-        "_",
-        "~",
-        "[",
-        "]",
-        "(",
-        ")",
-        "#",
-        "+",
-        "-",
-        ".",
-        "!",
-        ">",
-        "|",
-        "{",
-        "}",
-    }
-    out = []
-    for ch in str(text):
-        if ch in escape_set:
-            out.append("\\" + ch)
-        else:
-            out.append(ch)
-    return "".join(out)
+    return str(text).translate(_MD_TABLE)
 
 
 def _parse_int(raw: str, fallback: int) -> int:
@@ -172,6 +227,69 @@ def _is_true(raw: str) -> bool:
     return raw.lower() in {"1", "true", "yes", "on"}
 
 
+# (field, env suffix, default). Each field is read from CODEX_NOTIFY_<suffix>,
+# then OPENCODE_NOTIFY_<suffix>; the default's type selects the parser.
+_ENV_SPECS = (
+    ("title", "TITLE", "Codex"),
+    ("max_chars", "MAX_CHARS", DEFAULT_MAX_CHARS),
+    ("head", "HEAD", DEFAULT_HEAD),
+    ("tail", "TAIL", DEFAULT_TAIL),
+    ("notify_complete", "COMPLETE", True),
+    ("notify_noninteractive", "NONINTERACTIVE", False),
+    ("notify_subagent", "SUBAGENT", False),
+    ("notify_permission", "PERMISSION", True),
+    ("notify_error", "ERROR", True),
+    ("notify_question", "QUESTION", True),
+    ("include_prompt", "INCLUDE_PROMPT", False),
+    ("detach", "DETACH", True),
+    ("dedup_window_sec", "DEDUP_WINDOW_SEC", DEFAULT_DEDUP_WINDOW_SEC),
+    ("summarizer_timeout_sec", "SUMMARIZER_TIMEOUT_SEC", DEFAULT_SUMMARIZER_TIMEOUT_SEC),
+    ("summarizer_max_input_chars", "SUMMARIZER_MAX_INPUT_CHARS", DEFAULT_SUMMARIZER_MAX_INPUT_CHARS),
+    ("summarizer_min_chars", "SUMMARIZER_MIN_CHARS", DEFAULT_SUMMARIZER_MIN_CHARS),
+    ("summarizer_stream", "SUMMARIZER_STREAM", True),
+    ("summary_cache_ttl_sec", "SUMMARY_CACHE_TTL_SEC", DEFAULT_SUMMARY_CACHE_TTL_SEC),
+    ("coalesce_ms", "COALESCE_MS", 0),
+)
+# Fields where a non-positive value falls back to the default.
+_POSITIVE_FIELDS = frozenset(
+    ("max_chars", "summarizer_timeout_sec", "summarizer_max_input_chars", "summary_cache_ttl_sec")
+)
+# Limits passed to _truncate, which needs room for its "..." marker.
+_TRUNCATE_LIMIT_FIELDS = frozenset(("max_chars", "summarizer_max_input_chars"))
+
+_Config = namedtuple("_Config", tuple(field for field, _suffix, _default in _ENV_SPECS))
+
+
+@functools.lru_cache(maxsize=1)
+def _config() -> _Config:
+    """Read the notify settings once; the environment is fixed for the process."""
+    environ = os.environ
+    values: list[object] = []
+    for field, suffix, default in _ENV_SPECS:
+        raw = environ.get("CODEX_NOTIFY_" + suffix)
+        if raw is None:
+            raw = environ.get("OPENCODE_NOTIFY_" + suffix)
+        if raw is None:
+            values.append(default)
+            continue
+        raw = raw.strip()
+        if isinstance(default, bool):
+            value: object = _is_true(raw)
+        elif isinstance(default, int):
+            value = _parse_int(raw, default)
+        elif isinstance(default, float):
+            value = _parse_float(raw, default)
+        else:
+            value = raw
+        if field in _POSITIVE_FIELDS and value <= 0:
+            value = default
+        if field in _TRUNCATE_LIMIT_FIELDS:
+            value = max(value, 4)
+        values.append(value)
+    return _Config._make(values)
+
+
+@functools.lru_cache(maxsize=1)
 def _get_summarizer_config() -> tuple[str, str, str] | None:
     model = _env("GOTIFY_NOTIFY_SUMMARIZER_MODEL")
     endpoint = _normalize_base(_env("GOTIFY_NOTIFY_SUMMARIZER_ENDPOINT"))
@@ -195,37 +313,263 @@ def _join_endpoint(base_url: str, path: str) -> str:
     return f"{base_url}{path}"
 
 
-def _json_post(
-    url: str,
-    body: dict[str, object],
-    headers: dict[str, str],
-    timeout_sec: float,
-) -> dict[str, object] | None:
-    request_data = json.dumps(body, ensure_ascii=False).encode("utf-8")
-    request_headers = dict(headers)
-    request_headers.setdefault("User-Agent", _notify_user_agent())
-    req = urllib.request.Request(
-        url,
-        data=request_data,
-        headers=request_headers,
-        method="POST",
-    )
+class _HTTPStatusError(OSError):
+    def __init__(self, status: int, detail: str) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.detail = detail
+
+
+# Network modules (urllib, http.client) are imported inside the functions that
+# use them: most hook calls exit before sending anything and skip that cost.
+
+# Keep-alive connections reused for the lifetime of the process, keyed by
+# (scheme, host, port); a summarizer fallback hits the same host twice.
+_CONN_POOL: dict[tuple[str, str, int | None], http.client.HTTPConnection] = {}
+
+
+def _close_connections() -> None:
+    """Close pooled keep-alive sockets so servers see a clean FIN, not a reset."""
+    while _CONN_POOL:
+        _, conn = _CONN_POOL.popitem()
+        conn.close()
+
+
+def _urllib_post(url: str, data: bytes, headers: dict[str, str], timeout_sec: float) -> bytes:
+    import urllib.error
+    import urllib.request
+
+    req = urllib.request.Request(url, data=data, headers=headers, method="POST")
     try:
         with urllib.request.urlopen(req, timeout=timeout_sec) as response:
-            payload = response.read().decode("utf-8")
+            return response.read()
     except urllib.error.HTTPError as exc:
         try:
             detail = exc.read().decode("utf-8", errors="replace")
         except OSError:
             detail = ""
-        _log_line(f"http_error url={url} status={exc.code} detail={_log_preview(detail)}")
+        raise _HTTPStatusError(exc.code, detail) from exc
+
+
+def _pool_key(url: str) -> tuple[tuple[str, str, int | None], str] | None:
+    """Return (pool key, request path) for url, or None if urllib should handle it."""
+    import urllib.parse
+    import urllib.request
+
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if scheme not in {"http", "https"} or not host:
+        return None
+    # http.client ignores *_proxy settings, so leave proxied hosts to urllib.
+    if scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(host):
         return None
-    except (urllib.error.URLError, TimeoutError, OSError) as exc:
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return (scheme, host, parts.port), path
+
+
+def _pooled_connection(key: tuple[str, str, int | None], timeout_sec: float) -> http.client.HTTPConnection:
+    import http.client
+
+    conn = _CONN_POOL.get(key)
+    if conn is None:
+        scheme, host, port = key
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(host, port, timeout=timeout_sec)
+        _CONN_POOL[key] = conn
+    else:
+        conn.timeout = timeout_sec
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout_sec)
+    return conn
+
+
+def _prewarm(url: str, timeout_sec: float) -> None:
+    """Open the pooled connection for url ahead of its first request."""
+    target = _pool_key(url)
+    if target is None:
+        return
+    key, _ = target
+    conn = _pooled_connection(key, timeout_sec)
+    if conn.sock is not None:
+        return
+    try:
+        conn.connect()
+    except OSError as exc:
+        conn.close()
+        _CONN_POOL.pop(key, None)
+        _log_line(f"prewarm_failed url={url} kind={type(exc).__name__} detail={_log_preview(exc)}")
+
+
+def _http_post(url: str, data: bytes, headers: dict[str, str], timeout_sec: float) -> bytes:
+    """POST and return the response body; raises OSError (or _HTTPStatusError) on failure."""
+    target = _pool_key(url)
+    if target is None:
+        return _urllib_post(url, data, headers, timeout_sec)
+    key, path = target
+    return _pooled_post(key, path, data, headers, timeout_sec)
+
+
+def _socket_dropped(sock) -> bool:
+    """True if the peer closed (or broke) an idle keep-alive socket."""
+    import select
+    import socket
+
+    # A TLS socket exists only if ssl is already loaded; don't import it for plain HTTP.
+    ssl = sys.modules.get("ssl")
+    tls = ssl is not None and isinstance(sock, ssl.SSLSocket)
+    try:
+        if not select.select([sock], [], [], 0)[0]:
+            return False
+        # Readable while idle: EOF, or (TLS 1.3) just a session ticket.
+        timeout = sock.gettimeout()
+        sock.settimeout(0)
+        try:
+            if tls:
+                sock.recv(1)
+            else:
+                sock.recv(1, socket.MSG_PEEK)
+        finally:
+            sock.settimeout(timeout)
+    except BlockingIOError:
+        return False
+    except (OSError, ValueError) as exc:
+        return not (tls and isinstance(exc, ssl.SSLWantReadError))
+    # EOF, or bytes nobody asked for; either way the socket is unusable.
+    return True
+
+
+def _pooled_post(
+    key: tuple[str, str, int | None],
+    path: str,
+    data: bytes,
+    headers: dict[str, str],
+    timeout_sec: float,
+) -> bytes:
+    import http.client
+
+    conn = _pooled_connection(key, timeout_sec)
+    if conn.sock is not None and _socket_dropped(conn.sock):
+        # Closed by the server while idle; reconnect before sending anything.
+        conn.close()
+    # Resending is only safe when the request never went out, and only a socket
+    # that already served a request can have gone stale that way. Failures after
+    # sending are never retried: the server may have acted on the POST already.
+    served = getattr(conn, "_gotify_notify_served", False)
+    try:
+        try:
+            conn.request("POST", path, body=data, headers=headers)
+        except (ConnectionResetError, BrokenPipeError):
+            if not served:
+                raise
+            conn.close()
+            conn.request("POST", path, body=data, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+    except (OSError, http.client.HTTPException) as exc:
+        conn.close()
+        _CONN_POOL.pop(key, None)
+        if isinstance(exc, OSError):
+            raise
+        raise OSError(f"{type(exc).__name__}: {exc}") from exc
+    conn._gotify_notify_served = True
+    if response.will_close:
+        conn.close()
+        _CONN_POOL.pop(key, None)
+    if response.status >= 400:
+        raise _HTTPStatusError(response.status, body.decode("utf-8", errors="replace"))
+    return body
+
+
+def _sse_events(
+    url: str,
+    data: bytes,
+    headers: dict[str, str],
+    timeout_sec: float,
+) -> Iterator[tuple[bool, object]]:
+    """POST and yield (complete, event) pairs from a server-sent event stream.
+
+    A server that ignores "stream" and answers with plain JSON yields that object
+    once with complete=True. The connection is closed when the generator is, so
+    the caller can stop reading as soon as it has enough.
+    """
+    import http.client
+
+    target = _pool_key(url)
+    conn = None
+    if target is None:
+        import urllib.error
+        import urllib.request
+
+        req = urllib.request.Request(url, data=data, headers=headers, method="POST")
+        try:
+            response = urllib.request.urlopen(req, timeout=timeout_sec)
+        except urllib.error.HTTPError as exc:
+            try:
+                detail = exc.read().decode("utf-8", errors="replace")
+            except OSError:
+                detail = ""
+            raise _HTTPStatusError(exc.code, detail) from exc
+    else:
+        key, path = target
+        # A stream may be abandoned half-read, so it never goes back to the pool.
+        conn = _pooled_connection(key, timeout_sec)
+        del _CONN_POOL[key]
+        try:
+            conn.request("POST", path, body=data, headers=headers)
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            if isinstance(exc, OSError):
+                raise
+            raise OSError(f"{type(exc).__name__}: {exc}") from exc
+
+    try:
+        if response.status >= 400:
+            raise _HTTPStatusError(response.status, response.read().decode("utf-8", errors="replace"))
+        if "text/event-stream" not in (response.getheader("Content-Type") or ""):
+            yield True, _loads(response.read())
+            return
+        for line in response:
+            if not line.startswith(b"data:"):
+                continue
+            chunk = line[5:].strip()
+            if chunk == b"[DONE]":
+                return
+            try:
+                event = _loads(chunk)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield False, event
+    except http.client.HTTPException as exc:
+        raise OSError(f"{type(exc).__name__}: {exc}") from exc
+    finally:
+        response.close()
+        if conn is not None:
+            conn.close()
+
+
+def _json_post(
+    url: str,
+    body: dict[str, object],
+    headers: dict[str, str],
+    timeout_sec: float,
+) -> dict[str, object] | None:
+    """POST body as JSON; headers are sent as given and must include User-Agent."""
+    try:
+        payload = _http_post(url, _dumps(body), headers, timeout_sec).decode("utf-8", errors="replace")
+    except _HTTPStatusError as exc:
+        _log_line(f"http_error url={url} status={exc.status} detail={_log_preview(exc.detail)}")
+        return None
+    except OSError as exc:
         _log_line(f"request_error url={url} kind={type(exc).__name__} detail={_log_preview(exc)}")
         return None
 
     try:
-        data = json.loads(payload)
+        data = _loads(payload)
     except json.JSONDecodeError:
         _log_line(f"json_decode_error url={url} body={_log_preview(payload)}")
         return None
@@ -235,76 +579,162 @@ def _json_post(
     return None
 
 
+# Where OpenAI-style responses keep their text, in lookup order; "*" walks a list.
+_OAI_PATHS: tuple[tuple[str, ...], ...] = (
+    ("output_text",),
+    ("output", "*", "content", "*", "text"),
+    ("choices", "*", "message", "content"),
+)
+
+
+def _walk(value: object, path: tuple[str, ...]) -> Iterator[object]:
+    if not path:
+        yield value
+        return
+    step, rest = path[0], path[1:]
+    if step == "*":
+        if isinstance(value, list):
+            for item in value:
+                yield from _walk(item, rest)
+    elif isinstance(value, dict) and step in value:
+        yield from _walk(value[step], rest)
+
+
 def _extract_openai_text(response: dict[str, object]) -> str:
-    output_text = response.get("output_text")
-    if isinstance(output_text, str) and output_text.strip():
-        return _normalize_text(output_text)
-
-    output = response.get("output")
-    if isinstance(output, list):
-        for item in output:
-            if not isinstance(item, dict):
-                continue
-            content = item.get("content")
-            if not isinstance(content, list):
-                continue
-            for part in content:
-                if not isinstance(part, dict):
-                    continue
-                text = part.get("text")
-                if isinstance(text, str) and text.strip():
-                    return _normalize_text(text)
-
-    choices = response.get("choices")
+    return next(
+        (
+            _normalize_text(text)
+            for path in _OAI_PATHS
+            for text in _walk(response, path)
+            if isinstance(text, str) and text.strip()
+        ),
+        "",
+    )
+
+
+def _extract_stream_delta(event: dict[str, object]) -> str:
+    # Chat completions chunk: {"choices": [{"delta": {"content": "..."}}]}
+    choices = event.get("choices")
     if isinstance(choices, list):
         for choice in choices:
-            if not isinstance(choice, dict):
-                continue
-            message = choice.get("message")
-            if not isinstance(message, dict):
+            if isinstance(choice, dict) and isinstance(choice.get("delta"), dict):
+                content = choice["delta"].get("content")
+                if isinstance(content, str):
+                    return content
+        return ""
+    # Responses API event: {"type": "response.output_text.delta", "delta": "..."}
+    if event.get("type") == "response.output_text.delta":
+        delta = event.get("delta")
+        if isinstance(delta, str):
+            return delta
+    return ""
+
+
+# Statuses a server answers with when it rejects the "stream" field itself;
+# auth, routing, rate-limit and server errors would fail the same way unstreamed.
+_STREAM_REJECTED_STATUSES = frozenset((400, 415, 422))
+# Stored under a full endpoint URL in the routes cache (base URLs hold route names).
+NO_STREAM_ROUTE = "no_stream"
+
+
+def _summary_post(url: str, body: dict[str, object], headers: dict[str, str], timeout_sec: float) -> str:
+    """Request a summary from url and return its normalized text ("" on failure)."""
+    if not body.get("stream"):
+        data = _json_post(url, body, headers, timeout_sec)
+        return _extract_openai_text(data) if data else ""
+
+    request_headers = {**headers, "Accept": "text/event-stream"}
+    parts: list[str] = []
+    size = 0
+    events = _sse_events(url, _dumps(body), request_headers, timeout_sec)
+    try:
+        for complete, event in events:
+            if complete:
+                return _extract_openai_text(event) if isinstance(event, dict) else ""
+            if event.get("type") == "response.completed":
+                break
+            delta = _extract_stream_delta(event)
+            if not delta:
                 continue
-            content = message.get("content")
-            if isinstance(content, str) and content.strip():
-                return _normalize_text(content)
+            parts.append(delta)
+            size += len(delta)
+            # Summaries are cut to SUMMARY_MAX_CHARS anyway; stop paying for more tokens.
+            if size > SUMMARY_MAX_CHARS and len(_normalize_text("".join(parts))) > SUMMARY_MAX_CHARS:
+                break
+    except _HTTPStatusError as exc:
+        _log_line(f"http_error url={url} status={exc.status} detail={_log_preview(exc.detail)}")
+        if parts or exc.status not in _STREAM_REJECTED_STATUSES:
+            return _normalize_text("".join(parts))
+        # Some OpenAI-compatible servers reject "stream"; retry as a plain request
+        # and, if that works, remember to skip streaming for this URL.
+        _log_line(f"summarizer_stream_fallback url={url}")
+        plain_body = dict(body)
+        del plain_body["stream"]
+        summary = _summary_post(url, plain_body, headers, timeout_sec)
+        if summary:
+            _store_summary_route(url, NO_STREAM_ROUTE)
+        return summary
+    except (OSError, ValueError) as exc:
+        _log_line(f"request_error url={url} kind={type(exc).__name__} detail={_log_preview(exc)}")
+    finally:
+        events.close()
+    return _normalize_text("".join(parts))
 
+
+def _cached_summary(key: str, now: int, ttl_sec: int) -> str:
+    entry = _cache()["summary"].get(key)
+    if not isinstance(entry, dict):
+        return ""
+    summary = entry.get("summary")
+    ts = entry.get("ts")
+    if isinstance(summary, str) and isinstance(ts, int) and now - ts < ttl_sec:
+        return summary
     return ""
 
 
-def _summarize_with_llm(text: str) -> str:
-    summarizer = _get_summarizer_config()
-    if not summarizer:
-        _log_line("summarizer_skip reason=missing_summarizer_env")
-        return ""
+def _store_summary(key: str, summary: str, now: int) -> None:
+    global _CACHE_DIRTY
+    _cache()["summary"][key] = {"summary": summary, "ts": now}
+    _CACHE_DIRTY = True
+
 
+def _summarize_with_llm(text: str, summarizer: tuple[str, str, str], cfg: _Config) -> str:
     model, base_url, api_key = summarizer
     _log_line(f"summarizer_start model={model} endpoint={base_url}")
-    timeout_sec = _parse_float(
-        _env_first(
-            "CODEX_NOTIFY_SUMMARIZER_TIMEOUT_SEC",
-            "OPENCODE_NOTIFY_SUMMARIZER_TIMEOUT_SEC",
-            default=str(DEFAULT_SUMMARIZER_TIMEOUT_SEC),
-        ),
-        DEFAULT_SUMMARIZER_TIMEOUT_SEC,
-    )
-    if timeout_sec <= 0:
-        timeout_sec = DEFAULT_SUMMARIZER_TIMEOUT_SEC
-
-    max_input_chars = _parse_int(
-        _env_first(
-            "CODEX_NOTIFY_SUMMARIZER_MAX_INPUT_CHARS",
-            "OPENCODE_NOTIFY_SUMMARIZER_MAX_INPUT_CHARS",
-            default=str(DEFAULT_SUMMARIZER_MAX_INPUT_CHARS),
-        ),
-        DEFAULT_SUMMARIZER_MAX_INPUT_CHARS,
-    )
-    if max_input_chars <= 0:
-        max_input_chars = DEFAULT_SUMMARIZER_MAX_INPUT_CHARS
-
-    clipped = _truncate(_normalize_text(text), max_input_chars)
+    clipped = _truncate(_normalize_text(text), cfg.summarizer_max_input_chars)
     if not clipped:
         _log_line("summarizer_skip reason=empty_input")
         return ""
 
+    import hashlib
+
+    # Identical input (retries, duplicate events) reuses the previous summary,
+    # as long as it came from the same endpoint, model and prompt.
+    cache_key = hashlib.blake2b(
+        f"{SUMMARY_PROMPT_VERSION}|{base_url}|{model}|{clipped}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+    now = int(time.time())
+    cached = _cached_summary(cache_key, now, cfg.summary_cache_ttl_sec)
+    if cached:
+        _log_line("summarizer_success route=cache")
+        return cached
+
+    _flush_log()
+    summary = _request_summary(clipped, model, base_url, api_key, cfg)
+    if summary:
+        _store_summary(cache_key, summary, now)
+    return summary
+
+
+def _store_summary_route(base_url: str, route: str) -> None:
+    global _CACHE_DIRTY
+    _cache()["routes"][base_url] = route
+    _CACHE_DIRTY = True
+
+
+def _request_summary(clipped: str, model: str, base_url: str, api_key: str, cfg: _Config) -> str:
+    timeout_sec = cfg.summarizer_timeout_sec
+    stream = cfg.summarizer_stream
     prompt = (
         "You are a concise summarizer. Output plain text only.\n"
         "Use the same language as the input text.\n"
@@ -317,6 +747,7 @@ def _summarize_with_llm(text: str) -> str:
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}",
         "api-key": api_key,
+        "User-Agent": _notify_user_agent(),
     }
 
     chat_body = {
@@ -326,19 +757,6 @@ def _summarize_with_llm(text: str) -> str:
         ],
         "max_tokens": 80,
     }
-    chat_data = _json_post(
-        _join_endpoint(base_url, "/chat/completions"),
-        chat_body,
-        headers,
-        timeout_sec,
-    )
-    if chat_data:
-        summary = _extract_openai_text(chat_data)
-        if summary:
-            _log_line("summarizer_success route=chat_completions")
-            return _truncate(summary, 200)
-    _log_line("summarizer_fallback route=responses reason=chat_completions_failed_or_empty")
-
     responses_body = {
         "model": model,
         "input": [
@@ -350,69 +768,102 @@ def _summarize_with_llm(text: str) -> str:
         "reasoning": {"effort": "low"},
         "max_output_tokens": 80,
     }
-    responses_data = _json_post(
-        _join_endpoint(base_url, "/responses"),
-        responses_body,
-        headers,
-        timeout_sec,
-    )
-    if not responses_data:
-        _log_line("summarizer_failed reason=responses_failed")
-        return ""
-    summary = _extract_openai_text(responses_data)
-    if not summary:
-        _log_line("summarizer_failed reason=responses_empty_output")
-        return ""
-    _log_line("summarizer_success route=responses")
-    return _truncate(summary, 200)
+    routes = {
+        "chat_completions": ("/chat/completions", chat_body),
+        "responses": ("/responses", responses_body),
+    }
+    # Start with whichever route last worked for this endpoint, so gateways
+    # without chat/completions (or without /responses) cost one request.
+    known_routes = _cache()["routes"]
+    first = known_routes.get(base_url)
+    order = ("responses", "chat_completions") if first == "responses" else ("chat_completions", "responses")
+
+    for attempt, route in enumerate(order):
+        if attempt:
+            _log_line(f"summarizer_fallback route={route} reason={order[0]}_failed_or_empty")
+        path, body = routes[route]
+        url = _join_endpoint(base_url, path)
+        if stream and known_routes.get(url) != NO_STREAM_ROUTE:
+            body["stream"] = True
+        summary = _summary_post(url, body, headers, timeout_sec)
+        if summary:
+            _log_line(f"summarizer_success route={route}")
+            if known_routes.get(base_url) != route:
+                _store_summary_route(base_url, route)
+            return _truncate(summary, SUMMARY_MAX_CHARS)
+    _log_line(f"summarizer_failed reason={order[-1]}_failed_or_empty")
+    return ""
+
+
+_TEXT_CANDIDATE_KEYS = (
+    "last-assistant-message",
+    "last_assistant_message",
+    "input-messages",
+    "input_messages",
+    "message",
+    "content",
+    "text",
+    "assistant_message",
+    "assistant_response",
+    "output_text",
+    "output",
+    "response",
+    "result",
+    "reason",
+    "summary",
+    "prompt",
+    "error",
+    "hook_event",
+)
+# Lets dicts without any candidate key be skipped in one C-level pass.
+_TEXT_CANDIDATE_KEY_SET = frozenset(_TEXT_CANDIDATE_KEYS)
 
 
 def _extract_text_candidate(value: object) -> str:
-    if isinstance(value, str):
-        return _normalize_text(value)
-    if isinstance(value, list):
-        parts: list[str] = []
-        for item in value:
-            text = _extract_text_candidate(item)
-            if text:
-                parts.append(text)
-        return _normalize_text(" ".join(parts))
-    if isinstance(value, dict):
-        for key in (
-            "last-assistant-message",
-            "last_assistant_message",
-            "input-messages",
-            "input_messages",
-            "message",
-            "content",
-            "text",
-            "assistant_message",
-            "assistant_response",
-            "output_text",
-            "output",
-            "response",
-            "result",
-            "reason",
-            "summary",
-            "prompt",
-            "error",
-            "hook_event",
-        ):
-            if key in value:
-                text = _extract_text_candidate(value[key])
-                if text:
-                    return text
-    return ""
+    # Depth-first walk with an explicit stack. Lists contribute every non-empty
+    # part; dicts contribute only the first candidate key that yields any text.
+    # Each stack entry is (node, next_key_index, parts_len_when_dict_entered);
+    # next_key_index is -1 for nodes that have not been visited yet.
+    parts: list[str] = []
+    stack: list[tuple[object, int, int]] = [(value, -1, 0)]
+    while stack:
+        node, key_index, mark = stack.pop()
+        if key_index < 0:
+            if isinstance(node, str):
+                if node and not node.isspace():
+                    parts.append(node)
+            elif isinstance(node, list):
+                stack.extend((item, -1, 0) for item in reversed(node))
+            elif isinstance(node, dict) and not _TEXT_CANDIDATE_KEY_SET.isdisjoint(node):
+                stack.append((node, 0, len(parts)))
+            continue
+        if len(parts) > mark:
+            continue
+        for index in range(key_index, len(_TEXT_CANDIDATE_KEYS)):
+            key = _TEXT_CANDIDATE_KEYS[index]
+            if key in node:
+                stack.append((node, index + 1, mark))
+                stack.append((node[key], -1, 0))
+                break
+    return _normalize_text(" ".join(parts)) if parts else ""
+
+
+@functools.lru_cache(maxsize=None)
+def _key_variants(keys: tuple[str, ...]) -> tuple[str, ...]:
+    """Expand keys to their snake/kebab spellings, in lookup order, without repeats."""
+    variants: dict[str, None] = {}
+    for key in keys:
+        for variant in (key, key.replace("_", "-"), key.replace("-", "_")):
+            variants.setdefault(variant)
+    return tuple(variants)
 
 
 def _payload_get(container: object, *keys: str) -> object:
     if not isinstance(container, dict):
         return None
-    for key in keys:
-        variants = (key, key.replace("_", "-"), key.replace("-", "_"))
-        for variant in variants:
-            if variant in container:
-                return container[variant]
+    for variant in _key_variants(keys):
+        if variant in container:
+            return container[variant]
     return None
 
 
@@ -452,7 +903,10 @@ def _payload_last_assistant_message(payload: dict[str, object]) -> str:
     if value is None:
         hook_event = _hook_event_payload(payload)
         value = _payload_get(hook_event, "last_assistant_message", "last-assistant-message")
-    return _normalize_text(str(value or ""))
+    # Left raw: _preview only normalizes the ends it keeps, and the summarizer
+    # normalizes the full text once if it actually runs.
+    text = str(value or "")
+    return "" if text.isspace() else text
 
 
 def _payload_input_messages(payload: dict[str, object]) -> list[object]:
@@ -482,10 +936,12 @@ def _event_type(payload: dict[str, object]) -> str:
     return ""
 
 
+@functools.lru_cache(maxsize=1)
 def _thread_source_cache_path() -> Path:
     return Path.home() / ".codex" / ".gotify-notify-thread-source-cache.json"
 
 
+@functools.lru_cache(maxsize=1)
 def _sessions_root_path() -> Path:
     custom = _env("CODEX_NOTIFY_SESSIONS_DIR")
     if custom:
@@ -493,16 +949,53 @@ def _sessions_root_path() -> Path:
     return Path.home() / ".codex" / "sessions"
 
 
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Replace path with data so readers never see a partial file, even after a crash."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+            # Without this a power loss can leave the renamed file empty.
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Parsed once per process; written back at most once, and only if changed.
+_THREAD_SOURCE_CACHE: dict[str, dict[str, bool]] | None = None
+_THREAD_SOURCE_DIRTY = False
+
+
+def _thread_source_cache() -> dict[str, dict[str, bool]]:
+    global _THREAD_SOURCE_CACHE
+    if _THREAD_SOURCE_CACHE is None:
+        _THREAD_SOURCE_CACHE = _load_thread_source_cache()
+    return _THREAD_SOURCE_CACHE
+
+
+def _flush_thread_source_cache() -> None:
+    global _THREAD_SOURCE_DIRTY
+    if _THREAD_SOURCE_CACHE is not None and _THREAD_SOURCE_DIRTY:
+        _THREAD_SOURCE_DIRTY = False
+        _save_thread_source_cache(_THREAD_SOURCE_CACHE)
+
+
 def _load_thread_source_cache() -> dict[str, dict[str, bool]]:
-    path = _thread_source_cache_path()
     try:
-        if not path.exists():
-            return {}
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        data = _loads(_thread_source_cache_path().read_bytes())
         if not isinstance(data, dict):
             return {}
-    except (OSError, json.JSONDecodeError):
+    except (OSError, ValueError):
         return {}
 
     out: dict[str, dict[str, bool]] = {}
@@ -530,7 +1023,7 @@ def _save_thread_source_cache(cache: dict[str, dict[str, bool]]) -> None:
             overflow = len(cache) - DEFAULT_THREAD_SOURCE_CACHE_MAX_ENTRIES
             for key in keys[:overflow]:
                 cache.pop(key, None)
-        path.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+        _write_atomic(path, _dumps(cache))
     except OSError:
         return
 
@@ -559,26 +1052,57 @@ def _source_is_root_codex_session(source: object) -> bool:
     return normalized in {"cli", "exec"}
 
 
-def _detect_thread_source_flags_from_sessions(thread_id: str) -> dict[str, bool] | None:
-    sessions_root = _sessions_root_path()
-    if not sessions_root.exists():
-        return None
+def _find_rollout_files(root: Path, thread_id: str, limit: int = 3) -> list[Path]:
+    """Return up to limit rollout files for thread_id, searching newest first.
 
-    candidates = list(sessions_root.glob(f"**/rollout-*-{thread_id}.jsonl"))
+    Sessions live under YYYY/MM/DD directories, so walking names in reverse
+    order reaches recent threads after a handful of directories instead of
+    listing the whole tree.
+    """
+    suffix = f"-{thread_id}.jsonl"
+    found: list[Path] = []
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in reversed(entries):
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif name.startswith("rollout-") and name.endswith(suffix):
+                    found.append(Path(entry.path))
+                    if len(found) >= limit:
+                        return found
+            except OSError:
+                continue
+        # Push oldest first so the newest directory is popped next.
+        stack.extend(reversed(subdirs))
+    return found
+
+
+def _detect_thread_source_flags_from_sessions(thread_id: str) -> dict[str, bool] | None:
+    candidates = _find_rollout_files(_sessions_root_path(), thread_id)
     if not candidates:
         return None
-    candidates.sort(key=lambda item: item.stat().st_mtime, reverse=True)
+    if len(candidates) > 1:
+        candidates.sort(key=lambda item: item.stat().st_mtime, reverse=True)
 
-    for file_path in candidates[:3]:
+    for file_path in candidates:
         try:
             session_meta_payload: dict[str, object] | None = None
             approval_policy = ""
-            with file_path.open("r", encoding="utf-8") as fp:
-                for raw_line in fp:
-                    line = raw_line.strip()
-                    if not line:
+            with file_path.open("rb") as fp:
+                for line in fp:
+                    # Rollouts are mostly response items; only parse lines that
+                    # can carry the session header or the approval policy.
+                    if b'"session_meta"' not in line and b'"approval_policy"' not in line:
                         continue
-                    parsed = json.loads(line)
+                    parsed = _loads(line)
                     if not isinstance(parsed, dict):
                         continue
                     payload = parsed.get("payload")
@@ -603,17 +1127,20 @@ def _detect_thread_source_flags_from_sessions(thread_id: str) -> dict[str, bool]
                     not is_subagent and is_root_cli and approval_policy == "never"
                 ),
             }
-        except (OSError, json.JSONDecodeError):
+        except (OSError, ValueError):
             continue
     return None
 
 
+# Both the subagent and the noninteractive checks ask about the same thread.
+@functools.lru_cache(maxsize=8)
 def _thread_source_flags(thread_id: str) -> dict[str, bool]:
+    global _THREAD_SOURCE_DIRTY
     thread_id = thread_id.strip()
     if not thread_id:
         return {}
 
-    cache = _load_thread_source_cache()
+    cache = _thread_source_cache()
     if thread_id in cache:
         cached = cache[thread_id]
         if cached.get("source_checked"):
@@ -629,7 +1156,9 @@ def _thread_source_flags(thread_id: str) -> dict[str, bool]:
 
     detected["source_checked"] = True
     cache[thread_id] = detected
-    _save_thread_source_cache(cache)
+    if not _THREAD_SOURCE_DIRTY:
+        _THREAD_SOURCE_DIRTY = True
+        atexit.register(_flush_thread_source_cache)
     if detected.get("is_subagent"):
         _log_line(f"subagent_detected source=sessions thread_id={thread_id}")
     if detected.get("is_noninteractive_root"):
@@ -662,8 +1191,9 @@ def _looks_like_subagent_text(value: object) -> bool:
     return "subagent" in normalized or "sub-agent" in normalized or "child" in normalized
 
 
-def _has_parent_reference(container: dict[str, object]) -> bool:
-    for key in (
+# Key families checked by _is_subagent_event; each container is scanned once.
+_PARENT_KEYS = frozenset(
+    (
         "parent_id",
         "parentID",
         "parentId",
@@ -673,17 +1203,34 @@ def _has_parent_reference(container: dict[str, object]) -> bool:
         "parent_session",
         "parentSession",
         "parent",
-    ):
-        if key not in container:
-            continue
-        value = container.get(key)
-        if isinstance(value, str) and value.strip():
-            return True
-        if isinstance(value, (int, float)) and value != 0:
-            return True
-        if isinstance(value, dict) and value:
-            return True
-    return False
+    )
+)
+_SUBAGENT_FLAG_KEYS = frozenset(
+    (
+        "is_subagent",
+        "isSubagent",
+        "is_sub_agent",
+        "subagent",
+        "sub_agent",
+        "is_child",
+        "isChild",
+        "is_child_session",
+        "isChildSession",
+        "child_session",
+        "childSession",
+    )
+)
+_SUBAGENT_TYPE_KEYS = frozenset(
+    ("session_type", "sessionType", "agent_type", "agentType", "kind", "source")
+)
+
+
+def _is_parent_reference(value: object) -> bool:
+    if isinstance(value, str):
+        return bool(value.strip())
+    if isinstance(value, (int, float)):
+        return value != 0
+    return isinstance(value, dict) and bool(value)
 
 
 def _is_subagent_event(payload: dict[str, object], event_lower: str) -> bool:
@@ -691,9 +1238,6 @@ def _is_subagent_event(payload: dict[str, object], event_lower: str) -> bool:
         return True
 
     thread_id = _payload_thread_id(payload)
-    if thread_id and _is_subagent_thread(thread_id):
-        return True
-
     session_id = _payload_session_id(payload)
     if thread_id and session_id and thread_id != session_id:
         return True
@@ -708,263 +1252,593 @@ def _is_subagent_event(payload: dict[str, object], event_lower: str) -> bool:
             containers.append(nested)
 
     for container in containers:
-        if _has_parent_reference(container):
-            return True
-
-        for key in (
-            "is_subagent",
-            "isSubagent",
-            "is_sub_agent",
-            "subagent",
-            "sub_agent",
-            "is_child",
-            "isChild",
-            "is_child_session",
-            "isChildSession",
-            "child_session",
-            "childSession",
-        ):
-            if key in container and _is_true_like(container.get(key)):
-                return True
-
-        for key in (
-            "session_type",
-            "sessionType",
-            "agent_type",
-            "agentType",
-            "kind",
-            "source",
-        ):
-            if key in container and _looks_like_subagent_text(container.get(key)):
+        for key, value in container.items():
+            if key in _PARENT_KEYS:
+                if _is_parent_reference(value):
+                    return True
+            elif key in _SUBAGENT_FLAG_KEYS:
+                if _is_true_like(value):
+                    return True
+            elif key in _SUBAGENT_TYPE_KEYS and _looks_like_subagent_text(value):
                 return True
 
-    return False
+    # Last resort: the session files (or their cached verdict) on disk.
+    return bool(thread_id) and _is_subagent_thread(thread_id)
 
 
-def _extract_message(payload: dict[str, object], include_prompt: bool) -> tuple[str, str]:
-    event_type = _event_type(payload)
-    event_lower = event_type.lower()
+def _subagent_message(cfg: _Config) -> tuple[str, str]:
+    if cfg.notify_subagent:
+        return "✅ Subagent task completed", ""
+    return "", ""
 
-    head = _parse_int(_env_first("CODEX_NOTIFY_HEAD", "OPENCODE_NOTIFY_HEAD", default=str(DEFAULT_HEAD)), DEFAULT_HEAD)
-    tail = _parse_int(_env_first("CODEX_NOTIFY_TAIL", "OPENCODE_NOTIFY_TAIL", default=str(DEFAULT_TAIL)), DEFAULT_TAIL)
-    notify_complete = _is_true(_env_first("CODEX_NOTIFY_COMPLETE", "OPENCODE_NOTIFY_COMPLETE", default="true"))
-    notify_subagent = _is_true(_env_first("CODEX_NOTIFY_SUBAGENT", "OPENCODE_NOTIFY_SUBAGENT", default="false"))
-    notify_permission = _is_true(_env_first("CODEX_NOTIFY_PERMISSION", "OPENCODE_NOTIFY_PERMISSION", default="true"))
-    notify_error = _is_true(_env_first("CODEX_NOTIFY_ERROR", "OPENCODE_NOTIFY_ERROR", default="true"))
-    notify_question = _is_true(_env_first("CODEX_NOTIFY_QUESTION", "OPENCODE_NOTIFY_QUESTION", default="true"))
-    is_subagent = _is_subagent_event(payload, event_lower)
 
-    if "permission" in event_lower and ("ask" in event_lower or "request" in event_lower):
-        if notify_permission:
-            return "🔐 Permission request", ""
-        return "", ""
+def _handle_permission(payload: dict[str, object], event_lower: str, cfg: _Config) -> tuple[str, str]:
+    if cfg.notify_permission:
+        return "🔐 Permission request", ""
+    return "", ""
 
-    if "error" in event_lower:
-        if notify_error:
-            error_text = _extract_text_candidate(payload.get("error") or payload)
-            if "aborted" in error_text.lower():
-                return "", ""
-            return "❌ Session encountered an error", ""
-        return "", ""
-
-    if is_subagent and ("stop" in event_lower or "complete" in event_lower):
-        if notify_subagent:
-            return "✅ Subagent task completed", ""
-        return "", ""
 
-    if event_lower == "agent-turn-complete" or ("turn" in event_lower and "complete" in event_lower):
-        if is_subagent:
-            if notify_subagent:
-                return "✅ Subagent task completed", ""
+def _handle_error(payload: dict[str, object], event_lower: str, cfg: _Config) -> tuple[str, str]:
+    if cfg.notify_error:
+        error_text = _extract_text_candidate(payload.get("error") or payload)
+        if "aborted" in error_text.lower():
             return "", ""
-        if notify_complete:
-            assistant = _payload_last_assistant_message(payload)
-            if assistant:
-                preview = _preview(assistant, head, tail)
-                return "✅ " + _escape_markdown(preview), assistant
-            if include_prompt:
-                prompts = _payload_input_messages(payload)
-                if prompts:
-                    last_prompt = _extract_text_candidate(prompts[-1])
-                    if last_prompt:
-                        preview = _preview(last_prompt, head, tail)
-                        return "✅ " + _escape_markdown(preview), last_prompt
-            return "✅ Agent turn completed", ""
-        return "", ""
+        return "❌ Session encountered an error", ""
+    return "", ""
+
 
+def _handle_turn_complete(payload: dict[str, object], event_lower: str, cfg: _Config) -> tuple[str, str]:
+    if _is_subagent_event(payload, event_lower):
+        return _subagent_message(cfg)
+    if cfg.notify_complete:
+        assistant = _payload_last_assistant_message(payload)
+        if assistant:
+            preview = _preview(assistant, cfg.head, cfg.tail)
+            return "✅ " + _escape_markdown(preview), assistant
+        if cfg.include_prompt:
+            prompts = _payload_input_messages(payload)
+            if prompts:
+                last_prompt = _extract_text_candidate(prompts[-1])
+                if last_prompt:
+                    preview = _preview(last_prompt, cfg.head, cfg.tail)
+                    return "✅ " + _escape_markdown(preview), last_prompt
+        return "✅ Agent turn completed", ""
+    return "", ""
+
+
+def _handle_stop(payload: dict[str, object], event_lower: str, cfg: _Config) -> tuple[str, str]:
+    if _is_subagent_event(payload, event_lower):
+        return _subagent_message(cfg)
+    return _handle_default(payload, event_lower, cfg)
+
+
+def _handle_default(payload: dict[str, object], event_lower: str, cfg: _Config) -> tuple[str, str]:
     tool_name = str(_payload_get(payload, "tool_name", "tool") or "").lower()
     if not tool_name:
         hook_event = _hook_event_payload(payload)
         tool_name = str(_payload_get(hook_event, "tool_name", "tool") or "").lower()
-    if notify_question and tool_name == "question":
+    if cfg.notify_question and tool_name == "question":
         question_text = _extract_text_candidate(_payload_get(payload, "tool_input", "args") or payload)
         if question_text:
-            body = _preview(question_text, head, tail)
+            body = _preview(question_text, cfg.head, cfg.tail)
             return "❓ " + _escape_markdown(body), ""
         return "❓ Question", ""
 
-    if include_prompt:
+    if cfg.include_prompt:
         prompt = _extract_text_candidate(_payload_get(payload, "prompt") or _payload_input_messages(payload))
         if prompt:
-            preview = _preview(prompt, head, tail)
+            preview = _preview(prompt, cfg.head, cfg.tail)
             return "✅ " + _escape_markdown(preview), ""
 
     return "", ""
 
 
-def _dedup_cache_path() -> Path:
-    return Path.home() / ".codex" / ".gotify-notify-cache.json"
+_EVENT_HANDLERS = {
+    "permission": _handle_permission,
+    "error": _handle_error,
+    "turn-complete": _handle_turn_complete,
+    "stop": _handle_stop,
+}
 
 
-def _should_send(payload: dict[str, object], message: str) -> bool:
-    dedup_window_sec = _parse_int(
-        _env_first(
-            "CODEX_NOTIFY_DEDUP_WINDOW_SEC",
-            "OPENCODE_NOTIFY_DEDUP_WINDOW_SEC",
-            default=str(DEFAULT_DEDUP_WINDOW_SEC),
-        ),
-        DEFAULT_DEDUP_WINDOW_SEC,
+def _match_event_kind(event_lower: str) -> str:
+    if "permission" in event_lower and ("ask" in event_lower or "request" in event_lower):
+        return "permission"
+    if "error" in event_lower:
+        return "error"
+    if event_lower == "agent-turn-complete" or ("turn" in event_lower and "complete" in event_lower):
+        return "turn-complete"
+    if "stop" in event_lower or "complete" in event_lower:
+        return "stop"
+    return ""
+
+
+# Event names seen in practice resolve with one dict lookup; the substring
+# rules above still decide anything else (and produced these entries).
+_KNOWN_EVENT_KINDS = {
+    name: _match_event_kind(name)
+    for name in (
+        "agent-turn-complete",
+        "stop",
+        "subagent-stop",
+        "task-complete",
+        "error",
+        "session.error",
+        "permission.asked",
+        "permission-request",
+        "notification",
+        "session.idle",
+        "",
     )
+}
+
+
+def _event_kind(event_lower: str) -> str:
+    """Map a raw event name onto a key of _EVENT_HANDLERS ("" for anything else)."""
+    kind = _KNOWN_EVENT_KINDS.get(event_lower)
+    if kind is None:
+        kind = _match_event_kind(event_lower)
+    return kind
+
+
+def _extract_message(payload: dict[str, object], event_lower: str, cfg: _Config) -> tuple[str, str]:
+    handler = _EVENT_HANDLERS.get(_event_kind(event_lower), _handle_default)
+    return handler(payload, event_lower, cfg)
+
+
+@functools.lru_cache(maxsize=1)
+def _cache_path() -> Path:
+    return Path.home() / ".codex" / ".gotify-notify-cache.json"
+
+
+@functools.lru_cache(maxsize=1)
+def _dedup_log_path() -> Path:
+    return Path.home() / ".codex" / ".gotify-notify-dedup.log"
+
+
+# LLM summaries and the summarizer route that works per endpoint live in one
+# JSON cache file: it is read at most once per process and written back once
+# at exit. Dedup uses its own append-only log.
+_CACHE: dict[str, dict[str, object]] | None = None
+_CACHE_DIRTY = False
+# Rewrite the dedup log without expired lines once it holds this many entries.
+_DEDUP_LOG_COMPACT_LINES = 256
+_DEDUP_KEY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _load_cache() -> dict[str, dict[str, object]]:
+    try:
+        data = _loads(_cache_path().read_bytes())
+    except (OSError, ValueError):
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    summary = data.get("summary")
+    routes = data.get("routes")
+    return {
+        "summary": summary if isinstance(summary, dict) else {},
+        # base_url -> summarizer route that last returned a summary.
+        "routes": routes if isinstance(routes, dict) else {},
+    }
+
+
+def _cache() -> dict[str, dict[str, object]]:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = _load_cache()
+        atexit.register(_flush_cache)
+    return _CACHE
+
+
+def _flush_cache() -> None:
+    if _CACHE is None or not _CACHE_DIRTY:
+        return
+    now = int(time.time())
+    summary_ttl_sec = _config().summary_cache_ttl_sec
+    summary = {
+        key: entry
+        for key, entry in _CACHE["summary"].items()
+        if isinstance(entry, dict)
+        and isinstance(entry.get("ts"), int)
+        and now - entry["ts"] < summary_ttl_sec
+    }
+    path = _cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(path, _dumps({"summary": summary, "routes": _CACHE["routes"]}))
+    except OSError:
+        return
+
+
+def _live_dedup_lines(data: bytes, now: int, window_sec: int) -> bytes:
+    kept: list[bytes] = []
+    for line in data.splitlines(keepends=True):
+        ts_raw, sep, _key = line.partition(b"\t")
+        try:
+            if sep and now - int(ts_raw) < window_sec:
+                kept.append(line)
+        except ValueError:
+            continue
+    return b"".join(kept)
+
+
+def _should_send(payload: dict[str, object], event_type: str, message: str, dedup_window_sec: int) -> bool:
     if dedup_window_sec <= 0:
         return True
 
     session_id = _payload_session_id(payload)
-    event = _event_type(payload)
-    dedup_key = f"{session_id}|{event}|{message}"
+    dedup_key = f"{session_id}|{event_type}|{message}"
+    # One "<ts>\t<key>\n" line per sent message; escaping keeps each key on
+    # a single line with no tabs, so a plain substring search finds it.
+    key_bytes = dedup_key.translate(_DEDUP_KEY_ESCAPES).encode("utf-8")
     now = int(time.time())
-    cache_path = _dedup_cache_path()
+    path = _dedup_log_path()
     try:
-        cache_path.parent.mkdir(parents=True, exist_ok=True)
-        if cache_path.exists():
-            raw = cache_path.read_text(encoding="utf-8")
-            data = json.loads(raw)
-            if not isinstance(data, dict):
-                data = {}
-        else:
-            data = {}
-    except (OSError, json.JSONDecodeError):
-        data = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a+b") as handle:
+            # Serialize check-and-append so concurrent runs for the same event
+            # cannot both pass; the lock is released when the file is closed.
+            try:
+                import fcntl
+            except ImportError:
+                pass
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            handle.seek(0)
+            data = handle.read()
+            end = data.rfind(b"\t" + key_bytes + b"\n")
+            if end >= 0:
+                start = data.rfind(b"\n", 0, end) + 1
+                try:
+                    age = now - int(data[start:end])
+                except ValueError:
+                    age = dedup_window_sec
+                if age < dedup_window_sec:
+                    _log_line(f"dedup_skip key={_log_preview(dedup_key, 180)} age_sec={age}")
+                    return False
+            line = b"%d\t%s\n" % (now, key_bytes)
+            if data.count(b"\n") >= _DEDUP_LOG_COMPACT_LINES:
+                # Compact in place while holding the lock; replacing the file
+                # would strand runs already waiting on the old inode.
+                handle.truncate(0)
+                handle.write(_live_dedup_lines(data, now, dedup_window_sec) + line)
+            else:
+                handle.write(line)
+    except OSError:
+        return True
+    return True
 
-    last = data.get(dedup_key)
-    if isinstance(last, int) and now - last < dedup_window_sec:
-        _log_line(f"dedup_skip key={_log_preview(dedup_key, 180)} age_sec={now - last}")
-        return False
 
-    compacted: dict[str, int] = {}
-    for key, value in data.items():
-        if isinstance(key, str) and isinstance(value, int) and now - value < dedup_window_sec:
-            compacted[key] = value
-    compacted[dedup_key] = now
+def _push_gotify(base_url: str, token: str, title: str, message: str) -> None:
+    # Fixed shape: only the two strings need encoding. Byte-for-byte the same
+    # as _dumps({"title": ..., "message": ..., "priority": 5}).
+    body = b'{"title":' + _dumps(title) + b',"message":' + _dumps(message) + b',"priority":5}'
+    headers = {
+        "Content-Type": "application/json",
+        "X-Gotify-Key": token,
+        "User-Agent": _notify_user_agent(),
+    }
+    _http_post(f"{base_url}/message", body, headers, 10)
+
+
+_OUTBOX_MAX_AGE_SEC = 300
+
+
+@functools.lru_cache(maxsize=1)
+def _outbox_path() -> Path:
+    return Path.home() / ".codex" / ".gotify-notify-outbox.jsonl"
+
+
+def _drain_outbox() -> list[str]:
+    import fcntl
+
     try:
-        cache_path.write_text(json.dumps(compacted, ensure_ascii=False), encoding="utf-8")
+        with _outbox_path().open("r+b") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            raw = handle.read()
+            handle.truncate(0)
     except OSError:
-        pass
-    return True
+        return []
+    # Entries left behind by a flusher that died mid-window are dropped rather
+    # than delivered with some unrelated later burst.
+    oldest = time.time() - _OUTBOX_MAX_AGE_SEC
+    messages: list[str] = []
+    for line in raw.splitlines():
+        try:
+            entry = _loads(line)
+        except ValueError:
+            continue
+        if not isinstance(entry, dict) or not isinstance(entry.get("ts"), (int, float)) or entry["ts"] < oldest:
+            continue
+        message = entry.get("message")
+        if isinstance(message, str) and message:
+            messages.append(message)
+    return messages
+
+
+def _coalesced_push(
+    base_url: str, token: str, title: str, message: str, delay_sec: float, max_chars: int
+) -> bool:
+    """Queue message in the outbox and send the outbox as one push per window.
+
+    The first process to take the flusher lock sleeps for delay_sec, then sends
+    everything queued meanwhile, cut to max_chars; concurrent hook runs only
+    append. Returns False when coalescing is unavailable and the caller should
+    push directly.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
 
+    path = _outbox_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = os.open(path.with_suffix(".lock"), os.O_WRONLY | os.O_CREAT, 0o600)
+    except OSError as exc:
+        _log_line(f"coalesce_unavailable kind={type(exc).__name__} detail={_log_preview(exc)}")
+        return False
+    try:
+        try:
+            outbox_fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(outbox_fd, fcntl.LOCK_EX)
+                os.write(outbox_fd, _dumps({"ts": time.time(), "message": message}) + b"\n")
+            finally:
+                os.close(outbox_fd)
+        except OSError as exc:
+            _log_line(f"coalesce_unavailable kind={type(exc).__name__} detail={_log_preview(exc)}")
+            return False
+
+        while True:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                _log_line("coalesce_queued")
+                return True
+            try:
+                _flush_log()
+                time.sleep(delay_sec)
+                batch = _drain_outbox()
+                if batch:
+                    combined = _truncate("\n---\n".join(batch), max_chars)
+                    try:
+                        _push_gotify(base_url, token, title, combined)
+                        _log_line(f"run_success coalesced={len(batch)} message_chars={len(combined)}")
+                    except OSError as exc:
+                        _log_line(f"gotify_push_failed kind={type(exc).__name__} detail={_log_preview(exc)}")
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            # A run that appended after the drain but failed to take the lock
+            # before it was released is relying on us to pick its message up.
+            try:
+                if path.stat().st_size == 0:
+                    return True
+            except OSError:
+                return True
+    finally:
+        os.close(lock_fd)
 
-def _push_gotify(base_url: str, token: str, title: str, message: str) -> None:
-    body = json.dumps(
-        {"title": title, "message": message, "priority": 5},
-        ensure_ascii=False,
-    ).encode("utf-8")
-    req = urllib.request.Request(
-        f"{base_url}/message",
-        data=body,
-        headers={
-            "Content-Type": "application/json",
-            "X-Gotify-Key": token,
-            "User-Agent": _notify_user_agent(),
-        },
-        method="POST",
+
+# True once this process runs apart from the hook invocation Codex waits on.
+_DETACHED = False
+
+
+def _detach(payload: dict[str, object]) -> bool:
+    """Hand delivery off to a background process.
+
+    Returns True when the current process should go on and deliver the
+    notification, False when a detached child has taken over.
+    """
+    global _DETACHED
+    if hasattr(os, "fork"):
+        # The parent leaves through os._exit(); write its lines out now.
+        _flush_log()
+        try:
+            pid = os.fork()
+        except OSError as exc:
+            _log_line(f"detach_failed kind={type(exc).__name__} detail={_log_preview(exc)}")
+            return True
+        if pid != 0:
+            os._exit(0)
+        try:
+            os.setsid()
+            # Fork again so the worker is not a session leader and can never
+            # reacquire a controlling terminal; it is reparented to init.
+            if os.fork() != 0:
+                os._exit(0)
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            if devnull > 2:
+                os.close(devnull)
+        except OSError:
+            pass
+        _DETACHED = True
+        _log_line("detach_child")
+        return True
+
+    # No fork() (Windows): re-run this script detached and pipe the payload.
+    # The re-executed child starts with an empty cache, so save ours first,
+    # paying for _write_atomic's fsync in the foreground on this path only;
+    # a forked child inherits it and saves it through atexit instead.
+    _flush_thread_source_cache()
+    import subprocess
+
+    creationflags = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(
+        subprocess, "CREATE_NEW_PROCESS_GROUP", 0
     )
-    with urllib.request.urlopen(req, timeout=10):
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            creationflags=creationflags,
+        )
+        proc.stdin.write(_dumps(payload))
+        proc.stdin.close()
+    except OSError as exc:
+        _log_line(f"detach_failed kind={type(exc).__name__} detail={_log_preview(exc)}")
+        return True
+    return False
+
+
+def _summarize_overlapped(
+    text: str,
+    summarizer: tuple[str, str, str],
+    gotify_message_url: str,
+    cfg: _Config,
+) -> str:
+    """Run the summarizer while the Gotify connection is set up in parallel."""
+    gotify_target = _pool_key(gotify_message_url)
+    summarizer_target = _pool_key(summarizer[1])
+    # Pooled connections are not thread-safe; skip warming one the summarizer may use.
+    if gotify_target is None or summarizer_target is None or summarizer_target[0] == gotify_target[0]:
+        return _summarize_with_llm(text, summarizer, cfg)
+
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(_summarize_with_llm, text, summarizer, cfg)
+        _prewarm(gotify_message_url, 10)
+        return future.result()
+
+
+def _deliver(
+    payload: dict[str, object],
+    event_type: str,
+    message: str,
+    summarize_source: str,
+    gotify_url: str,
+    gotify_token: str,
+    cfg: _Config,
+) -> None:
+    # Resolved once up front: without a summarizer there is no prompt or body to build.
+    summarizer = _get_summarizer_config() if summarize_source else None
+    if summarize_source and summarizer is None:
+        _log_line("summarizer_skip reason=missing_summarizer_env")
+    elif summarize_source:
+        normalized = _normalize_text(summarize_source)
+        if 0 < len(normalized) <= cfg.summarizer_min_chars:
+            # Already about as short as the summary would be; not worth an LLM round-trip.
+            _log_line(f"summarizer_skip reason=short_input input_chars={len(normalized)}")
+            message = "✅ " + _escape_markdown(_truncate(normalized, SUMMARY_MAX_CHARS))
+        else:
+            _log_line(f"summarizer_attempt input_chars={len(summarize_source)}")
+            summary = _summarize_overlapped(summarize_source, summarizer, f"{gotify_url}/message", cfg)
+            if summary:
+                message = "✅ " + _escape_markdown(summary)
+                _log_line("summarizer_applied")
+            else:
+                _log_line("summarizer_failed fallback=preview")
+    else:
+        _log_line("summarizer_skip reason=empty_source")
+
+    if not _should_send(payload, event_type, message, cfg.dedup_window_sec):
+        _log_line("run_skip reason=dedup")
+        return
+    message = _truncate(message, cfg.max_chars)
+    # The flusher sleeps through the window; only do that off the hook's critical path.
+    if (
+        cfg.coalesce_ms > 0
+        and _DETACHED
+        and _coalesced_push(gotify_url, gotify_token, cfg.title, message, cfg.coalesce_ms / 1000, cfg.max_chars)
+    ):
         return
 
+    try:
+        _push_gotify(gotify_url, gotify_token, cfg.title, message)
+        _log_line(f"run_success event={event_type or 'unknown'} message_chars={len(message)}")
+    except OSError as exc:
+        _log_line(f"gotify_push_failed kind={type(exc).__name__} detail={_log_preview(exc)}")
+
+
+def _read_payload_from_argv(args: list[str]) -> dict[str, object] | None:
+    if not args:
+        return None
+    try:
+        parsed = _loads(args[-1])
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _read_payload_from_stdin() -> dict[str, object] | None:
+    # Read raw bytes up to a cap so a runaway producer cannot exhaust memory;
+    # The JSON parser takes bytes and skips surrounding whitespace itself.
+    chunks: list[bytes] = []
+    size = 0
+    try:
+        fd = sys.stdin.fileno()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_PAYLOAD_BYTES:
+                _log_line(f"payload_too_large limit_bytes={MAX_PAYLOAD_BYTES}")
+                return None
+            chunks.append(chunk)
+    except (AttributeError, OSError, ValueError):
+        return None
+    try:
+        parsed = _loads(b"".join(chunks))
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
 
 def main() -> int:
+    global _DETACHED
     _log_line("run_start")
-    payload: dict[str, object] | None = None
-    if len(sys.argv) >= 2:
-        payload_raw = sys.argv[-1]
-        try:
-            parsed = json.loads(payload_raw)
-        except json.JSONDecodeError:
-            parsed = None
-        if isinstance(parsed, dict):
-            payload = parsed
-
+    args = sys.argv[1:]
+    # Set when re-executed by _detach() on platforms without fork().
+    is_child = "--child" in args
+    if is_child:
+        _DETACHED = True
+        args = [arg for arg in args if arg != "--child"]
+
+    payload = _read_payload_from_argv(args)
     if payload is None:
-        try:
-            raw = sys.stdin.read().strip()
-        except OSError:
-            raw = ""
-        if raw:
-            try:
-                parsed = json.loads(raw)
-            except json.JSONDecodeError:
-                parsed = None
-            if isinstance(parsed, dict):
-                payload = parsed
+        payload = _read_payload_from_stdin()
 
     if not isinstance(payload, dict):
         _log_line("run_skip reason=invalid_payload")
         return 0
 
-    event_type = _event_type(payload) or "unknown"
+    # Resolved once here; handlers and dedup get it passed down.
+    event = _event_type(payload)
+    event_type = event or "unknown"
     thread_id = _payload_thread_id(payload) or _payload_session_id(payload) or "-"
     _log_line(f"payload_loaded event={event_type} thread_id={thread_id}")
 
-    notify_noninteractive = _is_true(
-        _env_first("CODEX_NOTIFY_NONINTERACTIVE", "OPENCODE_NOTIFY_NONINTERACTIVE", default="false")
-    )
-    if not notify_noninteractive and thread_id != "-" and _is_noninteractive_root_thread(thread_id):
-        _log_line(f"run_skip reason=noninteractive_root_session event={event_type} thread_id={thread_id}")
-        return 0
-
     gotify_url = _normalize_base(_env("GOTIFY_URL"))
     gotify_token = _env("GOTIFY_TOKEN_FOR_CODEX") or _env("GOTIFY_TOKEN_FOR_OPENCODE")
     if not gotify_url or not gotify_token:
         _log_line("run_skip reason=missing_gotify_config")
         return 0
 
-    include_prompt = _is_true(
-        _env_first("CODEX_NOTIFY_INCLUDE_PROMPT", "OPENCODE_NOTIFY_INCLUDE_PROMPT", default="false")
-    )
-    message, summarize_source = _extract_message(payload, include_prompt)
+    # Most events produce no message; find that out before the session-file
+    # lookup behind the noninteractive check.
+    cfg = _config()
+    message, summarize_source = _extract_message(payload, event.lower(), cfg)
     if not message:
         _log_line(f"run_skip reason=no_message event={event_type}")
         return 0
 
-    if summarize_source:
-        _log_line(f"summarizer_attempt input_chars={len(summarize_source)}")
-        summary = _summarize_with_llm(summarize_source)
-        if summary:
-            message = "✅ " + _escape_markdown(summary)
-            _log_line("summarizer_applied")
-        else:
-            _log_line("summarizer_failed fallback=preview")
-    else:
-        _log_line("summarizer_skip reason=empty_source")
-
-    max_chars = _parse_int(
-        _env_first("CODEX_NOTIFY_MAX_CHARS", "OPENCODE_NOTIFY_MAX_CHARS", default=str(DEFAULT_MAX_CHARS)),
-        DEFAULT_MAX_CHARS,
-    )
-    if max_chars <= 0:
-        max_chars = DEFAULT_MAX_CHARS
-    if not _should_send(payload, message):
-        _log_line("run_skip reason=dedup")
+    if not cfg.notify_noninteractive and thread_id != "-" and _is_noninteractive_root_thread(thread_id):
+        _log_line(f"run_skip reason=noninteractive_root_session event={event_type} thread_id={thread_id}")
         return 0
-    title = _env_first("CODEX_NOTIFY_TITLE", "OPENCODE_NOTIFY_TITLE", default="Codex")
-    message = _truncate(message, max_chars)
 
-    try:
-        _push_gotify(gotify_url, gotify_token, title, message)
-        _log_line(f"run_success event={event_type} message_chars={len(message)}")
-    except (urllib.error.URLError, TimeoutError, OSError) as exc:
-        _log_line(f"gotify_push_failed kind={type(exc).__name__} detail={_log_preview(exc)}")
+    if cfg.detach and not is_child and not _detach(payload):
         return 0
 
+    try:
+        _deliver(payload, event, message, summarize_source, gotify_url, gotify_token, cfg)
+    finally:
+        _close_connections()
     return 0
 
 
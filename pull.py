@@ -14,17 +14,31 @@ Env:
   NO_BACKUP=1 (optional)
   SETUP_NOTIFY_HOOKS=0 (optional; disable auto-configure Codex notify hook)
   SETUP_NOTIFY_HOOKS_FORCE=1 (optional; replace existing Codex notify line; default off)
+  USE_GIT=1 (optional; fetch with git clone instead of the GitHub tarball, e.g. for private repos)
+  NO_COLOR=1 (optional; plain output without ANSI colors, also the default when piped)
+  FORCE=1 (optional; reinstall even if REPO_REV has not changed since the last run)
 """
 
+from __future__ import annotations
+
 import os
+import functools
+import hashlib
 import json
 import re
 import sys
 import shutil
+import stat
 import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
 from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import http.client
 
 # Config from environment
 REPO_OWNER = os.environ.get("REPO_OWNER", "ControlNet")
@@ -36,6 +50,9 @@ OMP_AGENT_DIR_ENV = os.environ.get("OMP_AGENT_DIR", "").strip()
 NO_BACKUP = os.environ.get("NO_BACKUP", "0") == "1"
 SETUP_NOTIFY_HOOKS = os.environ.get("SETUP_NOTIFY_HOOKS", "1") == "1"
 SETUP_NOTIFY_HOOKS_FORCE = os.environ.get("SETUP_NOTIFY_HOOKS_FORCE", "0") == "1"
+USE_GIT = os.environ.get("USE_GIT", "0") == "1"
+FORCE = os.environ.get("FORCE", "0") == "1"
+REPO_URL = f"https://github.com/{REPO_OWNER}/{REPO_NAME}.git"
 
 REQUIRED_ENV_VARS = [
     "CODEX_BASE_URL",
@@ -50,15 +67,27 @@ REQUIRED_ENV_VARS = [
 # ─────────────────────────────────────────────────────────────────────────────
 # COLORS & STYLES (ANSI escape codes)
 # ─────────────────────────────────────────────────────────────────────────────
-RESET = "\033[0m"
-BOLD = "\033[1m"
-CYAN = "\033[36m"
-GREEN = "\033[32m"
-YELLOW = "\033[33m"
-RED = "\033[31m"
-MAGENTA = "\033[35m"
-
-BANNER = f"""{CYAN}{BOLD}
+# Plain output when piped or when NO_COLOR is set (https://no-color.org).
+USE_COLOR = sys.stdout.isatty() and not os.environ.get("NO_COLOR")
+
+RESET = "\033[0m" if USE_COLOR else ""
+BOLD = "\033[1m" if USE_COLOR else ""
+CYAN = "\033[36m" if USE_COLOR else ""
+GREEN = "\033[32m" if USE_COLOR else ""
+YELLOW = "\033[33m" if USE_COLOR else ""
+RED = "\033[31m" if USE_COLOR else ""
+MAGENTA = "\033[35m" if USE_COLOR else ""
+
+INFO_PREFIX = f"{CYAN}{BOLD}[INFO]{RESET}    "
+SUCCESS_PREFIX = f"{GREEN}{BOLD}[SUCCESS]{RESET} "
+WARN_PREFIX = f"{YELLOW}{BOLD}[WARN]{RESET}    "
+ERROR_PREFIX = f"{RED}{BOLD}[ERROR]{RESET}   "
+
+
+@functools.lru_cache(maxsize=1)
+def banner() -> str:
+    """Installer banner; built on first use so importing pull.py stays cheap."""
+    return f"""{CYAN}{BOLD}
  ██████╗ ██████╗ ███╗   ██╗████████╗██████╗  ██████╗ ██╗     ███╗   ██╗███████╗████████╗
 ██╔════╝██╔═══██╗████╗  ██║╚══██╔══╝██╔══██╗██╔═══██╗██║     ████╗  ██║██╔════╝╚══██╔══╝
 ██║     ██║   ██║██╔██╗ ██║   ██║   ██████╔╝██║   ██║██║     ██╔██╗ ██║█████╗     ██║   
@@ -79,28 +108,73 @@ BANNER = f"""{CYAN}{BOLD}
 """
 
 
+# Installs run on worker threads; keep their messages from interleaving.
+_PRINT_LOCK = threading.Lock()
+# While a list is set here, this thread's messages are collected into it as
+# (line, file) pairs instead of printed, so main can print them under their step.
+_CAPTURE = threading.local()
+
+
+def _emit(line: str, file=None) -> None:
+    lines = getattr(_CAPTURE, "lines", None)
+    if lines is not None:
+        lines.append((line, file))
+        return
+    with _PRINT_LOCK:
+        print(line, file=file)
+
+
+def _replay(lines: list[tuple[str, object]]) -> None:
+    with _PRINT_LOCK:
+        for line, file in lines:
+            print(line, file=file)
+
+
+def _run_captured(fn, *args) -> tuple[list[tuple[str, object]], Exception | None]:
+    """Run fn(*args); return the messages it printed and the exception it raised, if any.
+
+    Failures are returned rather than raised so main can still print the
+    task's messages, and those of later steps, in order before re-raising.
+    """
+    lines: list[tuple[str, object]] = []
+    _CAPTURE.lines = lines
+    try:
+        fn(*args)
+    except Exception as exc:
+        return lines, exc
+    finally:
+        _CAPTURE.lines = None
+    return lines, None
+
+
 def info(msg: str) -> None:
     """Print info message with cyan color."""
-    print(f"{CYAN}{BOLD}[INFO]{RESET}    {msg}")
+    _emit(INFO_PREFIX + msg)
 
 
 def success(msg: str) -> None:
     """Print success message with green color."""
-    print(f"{GREEN}{BOLD}[SUCCESS]{RESET} {msg}")
+    _emit(SUCCESS_PREFIX + msg)
 
 
 def warn(msg: str) -> None:
     """Print warning message with yellow color."""
-    print(f"{YELLOW}{BOLD}[WARN]{RESET}    {msg}", file=sys.stderr)
+    _emit(WARN_PREFIX + msg, sys.stderr)
 
 
 def error(msg: str) -> None:
     """Print error message with red color and exit."""
-    print(f"{RED}{BOLD}[ERROR]{RESET}   {msg}", file=sys.stderr)
+    _emit(ERROR_PREFIX + msg, sys.stderr)
+
+
+def item(msg: str) -> None:
+    """Print an indented list entry under the current step."""
+    _emit(f"         - {msg}")
 
 
 def timestamp() -> str:
-    return datetime.now().strftime("%Y%m%d-%H%M%S")
+    # Must stay sortable: cleanup_old_backups orders backups by name.
+    return time.strftime("%Y%m%d-%H%M%S")
 
 
 def warn_missing_required_env_vars() -> None:
@@ -117,6 +191,7 @@ def warn_missing_required_env_vars() -> None:
     info("Script will continue, but related features may not work as expected.")
 
 
+@functools.lru_cache(maxsize=1)
 def get_config_dir() -> Path:
     """Determine user-level config directory."""
     if CONFIG_DIR_ENV:
@@ -129,6 +204,7 @@ def get_config_dir() -> Path:
     return Path.home() / ".config" / "opencode"
 
 
+@functools.lru_cache(maxsize=1)
 def get_codex_dir() -> Path:
     """Determine Codex home directory."""
     if CODEX_DIR_ENV:
@@ -139,6 +215,7 @@ def get_codex_dir() -> Path:
     return Path.home() / ".codex"
 
 
+@functools.lru_cache(maxsize=1)
 def get_omp_agent_dir() -> Path:
     """Determine oh-my-pi agent config directory."""
     if OMP_AGENT_DIR_ENV:
@@ -159,6 +236,12 @@ OPENCODE_CONFIG_FILES = [
     ("_AGENTS.md", "AGENTS.md"),
 ]
 
+# Repo directories installed alongside the top-level files; the git path
+# checks out only these (top-level files are always part of a cone checkout).
+OPENCODE_ASSET_DIRS = ["plugins", "skills"]
+
+LEGACY_OPENCODE_CONFIG_NAMES = ["opencode.json"]
+
 LEGACY_OPENAGENT_CONFIG_NAMES = [
     "oh-my-opencode.json",
     "oh-my-opencode.jsonc",
@@ -167,57 +250,239 @@ LEGACY_OPENAGENT_CONFIG_NAMES = [
 
 
 def cleanup_old_backups(file_path: Path) -> None:
-    pattern = f"{file_path.name}.bak-*"
-    backups = sorted(file_path.parent.glob(pattern), key=lambda p: p.stat().st_mtime)
+    prefix = f"{file_path.name}.bak-"
+    # Backup names end in a %Y%m%d-%H%M%S stamp, so name order is creation
+    # order; mtime is not, since copies keep the original file's mtime.
+    with os.scandir(file_path.parent) as entries:
+        backups = sorted(
+            (entry for entry in entries if entry.name.startswith(prefix)),
+            key=lambda entry: entry.name,
+        )
     while len(backups) > MAX_BACKUPS:
         oldest = backups.pop(0)
-        oldest.unlink()
+        os.unlink(oldest.path)
         info(f"Removed old backup: {oldest.name}")
 
 
+# Directories known to exist, so repeated installs into one skip mkdir.
+_MKDIR_DONE: set[Path] = set()
+
+
+def ensure_dir(path: Path) -> None:
+    if path not in _MKDIR_DONE:
+        path.mkdir(parents=True, exist_ok=True)
+        _MKDIR_DONE.add(path)
+
+
+def _fast_copy(src: str | Path, dst: str | Path) -> None:
+    """shutil.copy2 equivalent that lets the kernel move the bytes where it can."""
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining <= 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            # EXDEV on older kernels, EINVAL/ENOSYS on some filesystems.
+            pass
+    shutil.copy2(src, dst)
+
+
+def _file_digest(path: Path) -> bytes:
+    with path.open("rb") as fp:
+        if hasattr(hashlib, "file_digest"):
+            # 3.11+: hashes through one reused buffer instead of a bytes object per chunk.
+            return hashlib.file_digest(fp, lambda: hashlib.blake2b(digest_size=16)).digest()
+        digest = hashlib.blake2b(digest_size=16)
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def same_content(src: Path, dst: Path) -> bool:
+    """True when dst already holds exactly the bytes of src."""
+    try:
+        if src.stat().st_size != dst.stat().st_size:
+            return False
+        return _file_digest(src) == _file_digest(dst)
+    except OSError:
+        return False
+
+
+def _same_mode(src: str | Path, dst: str | Path) -> bool:
+    return stat.S_IMODE(os.stat(src).st_mode) == stat.S_IMODE(os.stat(dst).st_mode)
+
+
 def backup_and_install(src: Path, dst: Path, stamp: str) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
+    # Re-runs mostly install unchanged files; leave them (and their backups) alone,
+    # but still pick up mode changes such as a script gaining +x.
+    if same_content(src, dst):
+        if not _same_mode(src, dst):
+            shutil.copymode(src, dst)
+        return
+    ensure_dir(dst.parent)
+    if dst.is_symlink():
+        # Managed dotfiles: write through the link and back up a real copy.
+        if not NO_BACKUP and dst.exists():
+            _fast_copy(dst, dst.with_suffix(f"{dst.suffix}.bak-{stamp}"))
+            cleanup_old_backups(dst)
+        _fast_copy(src, dst)
+        return
+
     if not NO_BACKUP and dst.exists():
-        backup_path = dst.with_suffix(f"{dst.suffix}.bak-{stamp}")
-        shutil.copy2(dst, backup_path)
+        # dst gets a fresh inode below, so the backup can keep the old one.
+        _link_or_copy(dst, dst.with_suffix(f"{dst.suffix}.bak-{stamp}"))
         cleanup_old_backups(dst)
-    shutil.copy2(src, dst)
+    tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    try:
+        _fast_copy(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 def rename_path_if_exists(path: Path, stamp: str) -> None:
     """Rename an existing file to a timestamped backup."""
-    if path.exists():
-        if path.suffix:
-            backup_path = path.with_suffix(f"{path.suffix}.bak-{stamp}")
-        else:
-            backup_path = path.with_name(f"{path.name}.bak-{stamp}")
+    if path.suffix:
+        backup_path = path.with_suffix(f"{path.suffix}.bak-{stamp}")
+    else:
+        backup_path = path.with_name(f"{path.name}.bak-{stamp}")
+    # link() + unlink() instead of rename(): link never replaces an existing
+    # backup, so a collision shows up as an error rather than a prior stat.
+    try:
+        try:
+            os.link(path, backup_path, follow_symlinks=False)
+        except FileExistsError:
+            backup_path = backup_path.with_suffix(f".bak-{stamp}-{os.getpid()}")
+            os.link(path, backup_path, follow_symlinks=False)
+    except FileNotFoundError:
+        return
+    except (OSError, NotImplementedError):
+        # Directories, or no hardlinks here: check first, then rename. rename()
+        # would replace an existing backup, so refuse rather than lose it.
+        if not path.exists():
+            return
         if backup_path.exists():
             backup_path = backup_path.with_suffix(f".bak-{stamp}-{os.getpid()}")
+            if backup_path.exists():
+                raise FileExistsError(f"Backup already exists: {backup_path}")
         path.rename(backup_path)
-        cleanup_old_backups(path)
+    else:
+        try:
+            os.unlink(path)
+        except OSError:
+            # Leave things as they were: the original in place, no extra link.
+            backup_path.unlink(missing_ok=True)
+            raise
+    cleanup_old_backups(path)
 
 
-def install_opencode_config_files(repo_path: Path, config_dir: Path, stamp: str) -> None:
-    for src_name, dst_name in OPENCODE_CONFIG_FILES:
-        src = repo_path / src_name
-        dst = config_dir / dst_name
-        if src.exists():
-            print(f"         - {src_name}")
-            backup_and_install(src, dst, stamp)
+def list_repo_entries(repo_path: Path) -> dict[str, Path]:
+    """Map each top-level name in the checkout to its path, from one readdir."""
+    with os.scandir(repo_path) as entries:
+        return {entry.name: Path(entry.path) for entry in entries}
 
 
-def retire_legacy_openagent_files(config_dir: Path, stamp: str) -> None:
-    for name in LEGACY_OPENAGENT_CONFIG_NAMES:
+def install_files(
+    executor: ThreadPoolExecutor,
+    files: list[tuple[str, str]],
+    repo_entries: dict[str, Path],
+    dst_root: Path,
+    stamp: str,
+) -> list[Future]:
+    """Queue backup_and_install for each (src, dst) name pair present in the repo."""
+    futures = []
+    for src_name, dst_name in files:
+        src = repo_entries.get(src_name)
+        if src is not None:
+            item(src_name)
+            futures.append(executor.submit(_run_captured, backup_and_install, src, dst_root / dst_name, stamp))
+    return futures
+
+
+def install_opencode_config_files(
+    executor: ThreadPoolExecutor, repo_entries: dict[str, Path], config_dir: Path, stamp: str
+) -> list[Future]:
+    return install_files(executor, OPENCODE_CONFIG_FILES, repo_entries, config_dir, stamp)
+
+
+def retire_legacy_config_files(config_dir: Path, stamp: str) -> None:
+    """Back up every legacy config name present, found with one readdir."""
+    legacy = {*LEGACY_OPENCODE_CONFIG_NAMES, *LEGACY_OPENAGENT_CONFIG_NAMES}
+    try:
+        with os.scandir(config_dir) as entries:
+            present = [entry.name for entry in entries if entry.name in legacy]
+    except FileNotFoundError:
+        return
+    for name in present:
         rename_path_if_exists(config_dir / name, stamp)
 
 
+def _link_or_copy(src: str | Path, dst: str | Path) -> None:
+    """Hardlink src to dst when they share a filesystem, otherwise copy it."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        _fast_copy(src, dst)
+
+
+def _remove_entry(entry: os.DirEntry) -> None:
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path)
+    else:
+        os.unlink(entry.path)
+
+
+def _sync_tree(src: str, dst: str) -> None:
+    """Make dst mirror src, rewriting only entries that differ."""
+    with os.scandir(src) as entries:
+        src_entries = {entry.name: entry for entry in entries}
+    try:
+        with os.scandir(dst) as entries:
+            dst_entries = {entry.name: entry for entry in entries}
+    except FileNotFoundError:
+        os.mkdir(dst)
+        dst_entries = {}
+
+    unchanged = set()
+    for name, entry in dst_entries.items():
+        src_entry = src_entries.get(name)
+        if src_entry is None or src_entry.is_dir() != entry.is_dir(follow_symlinks=False):
+            _remove_entry(entry)
+        elif src_entry.is_dir() or (
+            same_content(Path(src_entry.path), Path(entry.path)) and _same_mode(src_entry.path, entry.path)
+        ):
+            # Directories are synced below; identical files stay as they are.
+            unchanged.add(name)
+        else:
+            os.unlink(entry.path)
+
+    for name, entry in src_entries.items():
+        target = os.path.join(dst, name)
+        if entry.is_dir():
+            _sync_tree(entry.path, target)
+        elif name not in unchanged:
+            _link_or_copy(entry.path, target)
+    shutil.copystat(src, dst)
+
+
 def copy_directory(src_dir: Path, dst_dir: Path) -> None:
     if not src_dir.exists():
         warn(f"Source directory not found: {src_dir}")
         return
-    if dst_dir.exists():
-        shutil.rmtree(dst_dir)
-    shutil.copytree(src_dir, dst_dir)
+    if dst_dir.is_symlink() or (dst_dir.exists() and not dst_dir.is_dir()):
+        dst_dir.unlink()
+    # Sync in place so re-runs only touch what changed. New files are linked
+    # from the temporary checkout, which is safe since it is deleted after.
+    # Merge installs keep copying: two destinations must not share inodes.
+    _sync_tree(str(src_dir), str(dst_dir))
 
 
 def copy_directory_merge(src_dir: Path, dst_dir: Path) -> None:
@@ -225,30 +490,29 @@ def copy_directory_merge(src_dir: Path, dst_dir: Path) -> None:
     if not src_dir.exists():
         warn(f"Source directory not found: {src_dir}")
         return
-    dst_dir.mkdir(parents=True, exist_ok=True)
-    for entry in src_dir.iterdir():
-        target = dst_dir / entry.name
-        if entry.is_dir():
-            shutil.copytree(entry, target, dirs_exist_ok=True)
-        else:
-            shutil.copy2(entry, target)
+    # copytree merges into an existing tree: same-named files are overwritten,
+    # everything else under dst_dir is left in place.
+    shutil.copytree(src_dir, dst_dir, dirs_exist_ok=True, copy_function=_fast_copy)
 
 
 def backup_file_if_exists(path: Path, stamp: str) -> None:
     if NO_BACKUP or not path.exists():
         return
     backup_path = path.with_suffix(f"{path.suffix}.bak-{stamp}")
-    shutil.copy2(path, backup_path)
+    _fast_copy(path, backup_path)
     cleanup_old_backups(path)
 
 
+_OMP_BASE_URL_RE = re.compile(
+    r'^(\s*baseUrl:\s*)(["\']?)CODEX_BASE_URL\2(\s*(?:#.*)?)$', re.MULTILINE
+)
+_NOTIFY_RE = re.compile(r"^\s*notify\s*=")
+
+
 def render_omp_models(content: str, codex_base_url: str) -> tuple[str, bool]:
     """Render omp_models.yaml by inlining CODEX_BASE_URL placeholder."""
-    pattern = re.compile(
-        r'^(\s*baseUrl:\s*)(["\']?)CODEX_BASE_URL\2(\s*(?:#.*)?)$', re.MULTILINE
-    )
     quoted_url = json.dumps(codex_base_url)
-    rendered, count = pattern.subn(
+    rendered, count = _OMP_BASE_URL_RE.subn(
         lambda m: f"{m.group(1)}{quoted_url}{m.group(3)}", content
     )
     return rendered, count > 0
@@ -275,10 +539,17 @@ def backup_and_install_omp_models(src: Path, dst: Path, stamp: str) -> None:
             "oh-my-pi will not auto-expand it."
         )
 
-    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        unchanged = dst.read_text(encoding="utf-8") == content
+    except (OSError, UnicodeDecodeError):
+        unchanged = False
+    if unchanged:
+        return
+
+    ensure_dir(dst.parent)
     if not NO_BACKUP and dst.exists():
         backup_path = dst.with_suffix(f"{dst.suffix}.bak-{stamp}")
-        shutil.copy2(dst, backup_path)
+        _fast_copy(dst, backup_path)
         cleanup_old_backups(dst)
     try:
         dst.write_text(content, encoding="utf-8")
@@ -286,6 +557,18 @@ def backup_and_install_omp_models(src: Path, dst: Path, stamp: str) -> None:
         warn(f"Failed to write {dst}: {exc}")
 
 
+def top_level_notify(content: str) -> object:
+    """Return the top-level notify value via tomllib, or None if unknown."""
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11: the line-based scan below decides.
+        return None
+    try:
+        return tomllib.loads(content).get("notify")
+    except tomllib.TOMLDecodeError:
+        return None
+
+
 def ensure_codex_notify_config(codex_dir: Path, stamp: str) -> None:
     config_path = codex_dir / "config.toml"
     python_bin = sys.executable or "python3"
@@ -303,28 +586,51 @@ def ensure_codex_notify_config(codex_dir: Path, stamp: str) -> None:
         warn(f"Failed to read {config_path}: {exc}")
         return
 
+    # Re-runs usually find our line as the only notify, above any table; accept
+    # that without parsing when the text leaves no doubt, else fall through.
+    idx = content.find(desired_line)
+    end = idx + len(desired_line)
+    if (
+        idx != -1
+        and content.find("notify") == idx
+        and (idx == 0 or content[idx - 1] == "\n")
+        and "[" not in content[:idx]
+        and content[end : end + 1] in ("", "\n")
+        and content.find("notify", end) == -1
+    ):
+        info("Codex notify hook already configured; skip")
+        return
+
+    # Same hook written with other quoting or spacing still counts as configured.
+    if "codex-gotify-notify.py" in content and top_level_notify(content) == [python_bin, str(script_path)]:
+        info("Codex notify hook already configured; skip")
+        return
+
     if "codex-gotify-notify.py" in content:
         # Might still be in a non-top-level section from old installer logic.
         # Continue and normalize location instead of early return.
         pass
 
     lines = content.splitlines()
+    # Without "notify" anywhere only the first table header matters.
+    may_have_notify = "notify" in content
     first_section_idx = None
-    for idx, line in enumerate(lines):
-        stripped = line.strip()
-        if stripped.startswith("[") and stripped.endswith("]"):
-            first_section_idx = idx
-            break
-
     top_notify_idx = None
     any_notify_idx = []
     notify_with_codex_idx = []
     for idx, line in enumerate(lines):
-        if re.match(r"^\s*notify\s*=", line):
+        if first_section_idx is None:
+            stripped = line.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                first_section_idx = idx
+                if not may_have_notify:
+                    break
+                continue
+        if may_have_notify and _NOTIFY_RE.match(line):
             any_notify_idx.append(idx)
             if "codex-gotify-notify.py" in line:
                 notify_with_codex_idx.append(idx)
-            if first_section_idx is None or idx < first_section_idx:
+            if first_section_idx is None:
                 top_notify_idx = idx
 
     if top_notify_idx is not None:
@@ -365,103 +671,323 @@ def ensure_codex_notify_config(codex_dir: Path, stamp: str) -> None:
     success("Inserted top-level Codex notify configuration")
 
 
+SYNC_MARKER_NAME = ".pull-sha"
+
+
+def _settings_digest() -> str:
+    """Digest of the settings that shape what gets installed, besides the repo revision."""
+    settings = [
+        REPO_OWNER,
+        REPO_NAME,
+        REPO_REV,
+        str(get_codex_dir()),
+        str(get_omp_agent_dir()),
+        os.environ.get("CODEX_BASE_URL", "").strip(),
+        str(SETUP_NOTIFY_HOOKS),
+        str(SETUP_NOTIFY_HOOKS_FORCE),
+        # Written into the Codex notify line.
+        sys.executable,
+    ]
+    return hashlib.blake2b("\0".join(settings).encode(), digest_size=16).hexdigest()
+
+
+def installed_revision(config_dir: Path) -> str:
+    """Revision recorded by the last complete run with the same settings, or ""."""
+    try:
+        revision, digest = (config_dir / SYNC_MARKER_NAME).read_text(encoding="utf-8").split()
+    except (OSError, ValueError):
+        return ""
+    return revision if digest == _settings_digest() else ""
+
+
+def write_sync_marker(config_dir: Path, revision: str) -> None:
+    (config_dir / SYNC_MARKER_NAME).write_text(f"{revision}\n{_settings_digest()}\n", encoding="utf-8")
+
+
+def remote_revision(repo_url: str) -> str:
+    """Commit REPO_REV points at on the remote, or "" if it cannot be resolved."""
+    result = subprocess.run(
+        ["git", "ls-remote", repo_url, REPO_REV],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+    if result.returncode != 0 or not result.stdout:
+        return ""
+    return result.stdout.split(None, 1)[0]
+
+
+def checkout_revision(repo_path: Path) -> str:
+    """Commit checked out in repo_path, or "" if git cannot tell."""
+    result = subprocess.run(
+        ["git", "-C", str(repo_path), "rev-parse", "HEAD"], capture_output=True, text=True
+    )
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def clone_repository(repo_url: str, repo_path: Path) -> subprocess.CompletedProcess:
+    """Shallow-clone REPO_REV, fetching only the blobs the checkout needs."""
+    # Fail instead of hanging on a credential prompt.
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    # git writes straight to our stderr: a progress bar on a terminal, errors only otherwise.
+    progress = "--progress" if sys.stderr.isatty() else "--quiet"
+    shallow_args = [progress, "--depth", "1", "--branch", REPO_REV, repo_url, str(repo_path)]
+    result = subprocess.run(
+        [
+            "git",
+            "-c",
+            "protocol.version=2",
+            "clone",
+            "--single-branch",
+            "--no-tags",
+            "--filter=blob:none",
+            # Cone-mode sparse checkout: top-level files only, directories added below.
+            "--sparse",
+            *shallow_args,
+        ],
+        stdout=subprocess.DEVNULL,
+        env=env,
+    )
+    if result.returncode == 0:
+        sparse = subprocess.run(
+            ["git", "-C", str(repo_path), "sparse-checkout", "set", *OPENCODE_ASSET_DIRS],
+            stdout=subprocess.DEVNULL,
+            env=env,
+        )
+        if sparse.returncode != 0:
+            # Give up on sparseness rather than install from a partial tree.
+            return subprocess.run(
+                ["git", "-C", str(repo_path), "sparse-checkout", "disable"],
+                stdout=subprocess.DEVNULL,
+                env=env,
+            )
+        return sparse
+
+    # Stderr is not captured, so any failure may be an old git or a server
+    # without partial/sparse clone support; retry once with a plain shallow clone.
+    shutil.rmtree(repo_path, ignore_errors=True)
+    return subprocess.run(["git", "clone", *shallow_args], stdout=subprocess.DEVNULL, env=env)
+
+
+CODELOAD_HOST = "codeload.github.com"
+
+
+def connect_codeload() -> http.client.HTTPSConnection | None:
+    """Open a TLS connection to codeload, ready for download_repository()."""
+    import http.client
+    import urllib.request
+
+    # http.client does not honour proxy settings; let urllib handle those.
+    if "https" in urllib.request.getproxies():
+        return None
+    conn = http.client.HTTPSConnection(CODELOAD_HOST, timeout=30)
+    try:
+        conn.connect()
+    except OSError:
+        conn.close()
+        return None
+    return conn
+
+
+def _open_codeload(path: str, warm: Future | None):
+    """GET path on codeload, reusing the pre-opened connection when it is usable."""
+    import http.client
+    import urllib.request
+
+    conn = warm.result() if warm is not None else None
+    if conn is not None:
+        try:
+            conn.request("GET", path, headers={"User-Agent": "pull.py", "Connection": "close"})
+            resp = conn.getresponse()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+        else:
+            if resp.status == 200:
+                return resp
+            # Redirects and errors: let urllib follow or report them.
+            resp.close()
+            conn.close()
+    return urllib.request.urlopen(f"https://{CODELOAD_HOST}{path}", timeout=30)
+
+
+def _is_installed_member(name: str) -> bool:
+    """True for the archive root, its top-level entries, and the asset dir trees."""
+    parts = name.strip("/").split("/")
+    return len(parts) <= 2 or parts[1] in OPENCODE_ASSET_DIRS
+
+
+def download_repository(
+    dest_dir: Path, warm: Future | None = None, current: str = ""
+) -> tuple[Path | None, str]:
+    """Extract the REPO_REV tarball from codeload into dest_dir.
+
+    Returns the source root and the archive's ETag as its revision. When the
+    ETag equals current, nothing is extracted and the root is None.
+
+    warm is an optional future from connect_codeload(), started earlier so the
+    TLS handshake overlaps the rest of start-up.
+    """
+    import http.client
+    import tarfile
+    import urllib.parse
+
+    dest_dir.mkdir()
+    path = f"/{REPO_OWNER}/{REPO_NAME}/tar.gz/{urllib.parse.quote(REPO_REV, safe='/')}"
+    url = f"https://{CODELOAD_HOST}{path}"
+    try:
+        with _open_codeload(path, warm) as resp:
+            revision = resp.headers.get("ETag", "").strip()
+            if current and revision == current:
+                return None, revision
+            with tarfile.open(fileobj=resp, mode="r|gz") as archive:
+                # Skip subtrees nothing installs from, so they are neither
+                # written here nor deleted again with the temp directory.
+                members = (member for member in archive if _is_installed_member(member.name))
+                if hasattr(tarfile, "data_filter"):
+                    archive.extractall(dest_dir, members=members, filter="data")
+                else:
+                    # No extraction filters on this Python: keep plain files and
+                    # directories with relative, non-escaping names only.
+                    for member in members:
+                        name = Path(member.name)
+                        if name.is_absolute() or ".." in name.parts:
+                            continue
+                        if member.isfile() or member.isdir():
+                            archive.extract(member, dest_dir)
+    except (OSError, tarfile.TarError, http.client.HTTPException) as exc:
+        warn(f"Failed to download {url}: {exc}")
+        return None, ""
+
+    # The archive holds a single top-level "<repo>-<rev>" directory.
+    roots = [entry for entry in dest_dir.iterdir() if entry.is_dir()]
+    if len(roots) != 1:
+        warn(f"Unexpected archive layout from {url}")
+        return None, ""
+    return roots[0], revision
+
+
 def main():
-    print(BANNER)
+    warm = None
+    if not USE_GIT:
+        # Resolve and handshake with codeload while the banner and checks run.
+        warmer = ThreadPoolExecutor(max_workers=1)
+        warm = warmer.submit(connect_codeload)
+        warmer.shutdown(wait=False)
+
+    print(banner())
     warn_missing_required_env_vars()
 
     config_dir = get_config_dir()
     codex_dir = get_codex_dir()
     omp_agent_dir = get_omp_agent_dir()
-    config_dir.mkdir(parents=True, exist_ok=True)
-    codex_dir.mkdir(parents=True, exist_ok=True)
-    omp_agent_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dir(config_dir)
+    ensure_dir(codex_dir)
+    ensure_dir(omp_agent_dir)
     stamp = timestamp()
 
-    repo_url = f"https://github.com/{REPO_OWNER}/{REPO_NAME}.git"
-
     with TemporaryDirectory() as tmp_dir:
         tmp_path = Path(tmp_dir)
         repo_path = tmp_path / REPO_NAME
 
-        info(f"[1/7] Cloning repository (branch/tag: {REPO_REV})...")
-        result = subprocess.run(
-            [
-                "git",
-                "clone",
-                "--depth",
-                "1",
-                "--branch",
-                REPO_REV,
-                repo_url,
-                str(repo_path),
-            ],
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode != 0:
-            error(f"Failed to clone repository")
-            print(result.stderr, file=sys.stderr)
-            sys.exit(1)
-
-        info(f"[2/7] Installing OpenCode config files to: {config_dir}")
-        install_opencode_config_files(repo_path, config_dir, stamp)
-
-        info("[3/7] Installing OpenCode plugins and skills...")
-        for dir_name in ["plugins", "skills"]:
-            src_dir = repo_path / dir_name
-            dst_dir = config_dir / dir_name
-            if src_dir.exists():
-                print(f"         - {dir_name}/")
-                copy_directory(src_dir, dst_dir)
-
-        info(f"[4/7] Installing oh-my-pi config files to: {omp_agent_dir}")
-        omp_config_files = [
-            ("omp_config.yml", "config.yml"),
-        ]
-        for src_name, dst_name in omp_config_files:
-            src = repo_path / src_name
-            dst = omp_agent_dir / dst_name
-            if src.exists():
-                print(f"         - {src_name}")
-                backup_and_install(src, dst, stamp)
-
-        omp_extension_files = [
-            ("omp-gotify-notify.js", "extensions/omp-gotify-notify.js"),
-        ]
-        for src_name, dst_name in omp_extension_files:
-            src = repo_path / src_name
-            dst = omp_agent_dir / dst_name
-            if src.exists():
-                print(f"         - {src_name}")
-                backup_and_install(src, dst, stamp)
-
-        omp_models_src = repo_path / "omp_models.yaml"
-        omp_models_dst = omp_agent_dir / "models.yml"
-        if omp_models_src.exists():
-            print("         - omp_models.yaml (render CODEX_BASE_URL)")
-            backup_and_install_omp_models(omp_models_src, omp_models_dst, stamp)
-
-        info(f"[5/7] Installing shared Codex assets to: {codex_dir}")
-        codex_files = [
-            ("_AGENTS.md", "AGENTS.md"),
-            ("codex-gotify-notify.py", "codex-gotify-notify.py"),
-        ]
-        for src_name, dst_name in codex_files:
-            src = repo_path / src_name
-            dst = codex_dir / dst_name
-            if src.exists():
-                print(f"         - {src_name}")
-                backup_and_install(src, dst, stamp)
-
-        codex_skills_src = repo_path / "skills"
-        codex_skills_dst = codex_dir / "skills"
-        if codex_skills_src.exists():
-            print("         - skills/ (merge)")
-            copy_directory_merge(codex_skills_src, codex_skills_dst)
+        # Skip the whole install when REPO_REV has not moved since the last run.
+        current = "" if FORCE else installed_revision(config_dir)
+        archive_root = None
+        revision = ""
+        if not USE_GIT:
+            info(f"[1/7] Downloading repository snapshot (branch/tag: {REPO_REV})...")
+            archive_root, revision = download_repository(tmp_path / "archive", warm, current)
+            if current and revision == current:
+                success(f"Already up to date with {REPO_REV}; set FORCE=1 to reinstall")
+                return
+            if archive_root is None:
+                info("Falling back to git clone")
+        if archive_root is not None:
+            repo_path = archive_root
+        else:
+            # ls-remote only pays off when there is a revision to compare against.
+            if current and remote_revision(REPO_URL) == current:
+                success(f"Already up to date with {REPO_REV}; set FORCE=1 to reinstall")
+                return
+            info(f"[1/7] Cloning repository (branch/tag: {REPO_REV})...")
+            result = clone_repository(REPO_URL, repo_path)
+            if result.returncode != 0:
+                error(f"Failed to clone repository")
+                sys.exit(1)
+            revision = checkout_revision(repo_path)
+
+        repo_entries = list_repo_entries(repo_path)
+
+        # Every install in steps 2-5 writes a destination no other one touches,
+        # so they all run on a small pool; all finish before step 6. Step
+        # headers and task futures are queued in order, and each task's
+        # messages are printed under its own step once it has finished.
+        output: list[tuple[str, object] | Future] = []
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            _CAPTURE.lines = output
+            try:
+                info(f"[2/7] Installing OpenCode config files to: {config_dir}")
+                output += install_opencode_config_files(executor, repo_entries, config_dir, stamp)
+
+                info("[3/7] Installing OpenCode plugins and skills...")
+                for dir_name in OPENCODE_ASSET_DIRS:
+                    src_dir = repo_entries.get(dir_name)
+                    dst_dir = config_dir / dir_name
+                    if src_dir is not None:
+                        item(f"{dir_name}/")
+                        # Disjoint destination trees; copy them alongside each other.
+                        output.append(executor.submit(_run_captured, copy_directory, src_dir, dst_dir))
+
+                info(f"[4/7] Installing oh-my-pi config files to: {omp_agent_dir}")
+                omp_config_files = [
+                    ("omp_config.yml", "config.yml"),
+                ]
+                output += install_files(executor, omp_config_files, repo_entries, omp_agent_dir, stamp)
+
+                omp_extension_files = [
+                    ("omp-gotify-notify.js", "extensions/omp-gotify-notify.js"),
+                ]
+                output += install_files(executor, omp_extension_files, repo_entries, omp_agent_dir, stamp)
+
+                omp_models_src = repo_entries.get("omp_models.yaml")
+                omp_models_dst = omp_agent_dir / "models.yml"
+                if omp_models_src is not None:
+                    item("omp_models.yaml (render CODEX_BASE_URL)")
+                    output.append(
+                        executor.submit(
+                            _run_captured, backup_and_install_omp_models, omp_models_src, omp_models_dst, stamp
+                        )
+                    )
+
+                info(f"[5/7] Installing shared Codex assets to: {codex_dir}")
+                codex_files = [
+                    ("_AGENTS.md", "AGENTS.md"),
+                    ("codex-gotify-notify.py", "codex-gotify-notify.py"),
+                ]
+                output += install_files(executor, codex_files, repo_entries, codex_dir, stamp)
+
+                codex_skills_src = repo_entries.get("skills")
+                codex_skills_dst = codex_dir / "skills"
+                if codex_skills_src is not None:
+                    item("skills/ (merge)")
+                    output.append(
+                        executor.submit(_run_captured, copy_directory_merge, codex_skills_src, codex_skills_dst)
+                    )
+            finally:
+                _CAPTURE.lines = None
+
+            failure = None
+            for entry in output:
+                if not isinstance(entry, Future):
+                    _replay([entry])
+                    continue
+                lines, exc = entry.result()
+                _replay(lines)
+                failure = failure or exc
+            if failure is not None:
+                raise failure
 
         info("[6/7] Retiring legacy OpenAgent config names so only current .jsonc remains active")
-        rename_path_if_exists(config_dir / "opencode.json", stamp)
-        retire_legacy_openagent_files(config_dir, stamp)
+        retire_legacy_config_files(config_dir, stamp)
 
         info("[7/7] Optionally configuring Codex notify hook")
         if SETUP_NOTIFY_HOOKS:
@@ -469,6 +995,9 @@ def main():
         else:
             info("SETUP_NOTIFY_HOOKS=0; skip hook auto-setup")
 
+        if revision:
+            write_sync_marker(config_dir, revision)
+
     print()
     success("Installation complete!")
     info(f"Timestamp: {stamp}")